@@ -9,8 +9,10 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from core.async_views import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Serve the read endpoints from async views under ASGI
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
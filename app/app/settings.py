@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # External packages
     'rest_framework',
     'rest_framework.authtoken',
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,14 +86,85 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Postgres with health checks and optional pooling, see core/db
+        'ENGINE': 'core.db',
         "HOST": os.environ.get('DB_HOST'),
         "NAME": os.environ.get('DB_NAME'),
         "USER": os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Keep connections open between requests for this many seconds
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Check a kept connection still works before reusing it
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', '1') == '1',
+        # Behind a transaction level pooler such as PgBouncer, a session
+        # lasts one transaction, so named cursors cannot span fetches
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get(
+            'DB_TRANSACTION_POOLER', '0') == '1',
     }
 }
 
+# Share up to DB_POOL_SIZE connections between threads. Connections go
+# back to the pool after each request and are recycled after
+# DB_CONN_MAX_AGE seconds instead
+if int(os.environ.get('DB_POOL_SIZE', 0)):
+    DATABASES['default']['POOL'] = {
+        'max_size': int(os.environ['DB_POOL_SIZE']),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_age': DATABASES['default']['CONN_MAX_AGE'] or None,
+    }
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Read replicas of the primary, as a comma separated list of hosts. Safe
+# requests to the API views read from them, see core/db/routers.py
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get(
+        'DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        # Tests read the data written to the test primary
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+# Cache alias from CACHES holding those pins. With replicas configured it
+# must be shared by every worker, which the system checks enforce
+REPLICA_PIN_CACHE_ALIAS = os.environ.get(
+    'DB_REPLICA_PIN_CACHE_ALIAS', 'default')
+
+# manage.py wait_for_db
+# Seconds to wait for every database before exiting with an error
+DB_WAIT_TIMEOUT = float(os.environ.get('DB_WAIT_TIMEOUT', 60))
+# Seconds before the first retry, doubled after each failed attempt up to
+# DB_WAIT_MAX_INTERVAL
+DB_WAIT_INTERVAL = float(os.environ.get('DB_WAIT_INTERVAL', 0.1))
+DB_WAIT_MAX_INTERVAL = float(os.environ.get('DB_WAIT_MAX_INTERVAL', 2))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory by default, point CACHE_BACKEND at a shared backend such as
+# django.core.cache.backends.memcached.PyMemcacheCache in production
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Cache alias and seconds for per-user list responses. The alias also
+# holds the data versions behind the ETags, so it must be shared by every
+# process. None keeps the versions in the database and caches nothing
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -110,6 +184,27 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PBKDF2 with a configurable cost first, the rest verify older hashes
+PASSWORD_HASHERS = [
+    'core.hashing.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+if os.environ.get('PASSWORD_HASH_ITERATIONS'):
+    PASSWORD_HASH_ITERATIONS = int(os.environ['PASSWORD_HASH_ITERATIONS'])
+
+# Hash passwords on a pool of PASSWORD_HASH_WORKERS threads or processes,
+# or inline on the request thread. Half the cores by default, so a login
+# burst leaves the other half to the rest of the API
+PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')
+PASSWORD_HASH_WORKERS = int(os.environ.get(
+    'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+# Hashes queued or running at once, and seconds to wait for a slot
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get(
+    'PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_WORKERS * 4))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -128,7 +223,11 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
-STATIC_URL = '/static/'
+STATIC_URL = '/static/static/'
+MEDIA_URL = '/static/media/'
+
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/vol/web/static')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -140,6 +239,70 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    )
+        'core.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
+
+# Serve reads from async views, switched on by app/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+ASYNC_READ_WORKERS = int(os.environ.get('ASYNC_READ_WORKERS', 16))
+
+# Render the recipe list from values() rows instead of model serializers
+RECIPE_FAST_LIST = os.environ.get('RECIPE_FAST_LIST', '1') == '1'
+
+# Recipe image thumbnails
+# queue resizes on the job worker with retries, thread on a pool in the
+# web process, inline on commit in the request (tests and scripts)
+RECIPE_THUMBNAIL_EXECUTOR = os.environ.get(
+    'RECIPE_THUMBNAIL_EXECUTOR', 'queue')
+RECIPE_THUMBNAIL_WORKERS = int(os.environ.get('RECIPE_THUMBNAIL_WORKERS', 2))
+# Longest edge in pixels of each rendition, small is used by the list
+RECIPE_THUMBNAIL_SIZES = {
+    'small': int(os.environ.get('RECIPE_THUMBNAIL_SMALL', 160)),
+    'medium': int(os.environ.get('RECIPE_THUMBNAIL_MEDIUM', 480)),
+    'large': int(os.environ.get('RECIPE_THUMBNAIL_LARGE', 1024)),
+}
+
+# Background jobs run by manage.py run_worker
+# Threads per worker process
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 4))
+# Seconds idle threads wait between queue checks without a notification
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 5))
+# Tries before a failing job is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+# Seconds before the first retry, doubled for each further retry
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 10))
+# Seconds after which a running job's worker is presumed dead
+JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', 600))
+
+# Request metrics served at /metrics
+# With a token set, scrapers must send Authorization: Bearer <token>.
+# Without one, only these networks may scrape. Loopback by default: a
+# port published by Docker forwards every client from its bridge network,
+# so set a token rather than allowing private ranges behind one
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_NETWORKS = [
+    network.strip() for network in os.environ.get(
+        'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128',
+    ).split(',') if network.strip()
+]
+
+# Token authentication cache
+# Seconds a token lookup may be served from cache. With the shared tier,
+# deleted tokens and saved users are dropped in every process at once.
+# Without it, other processes may accept a deleted token or deactivated
+# user for up to this long, so keep it short
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 10))
+# Entries held by the in-process LRU
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+# Optional shared cache alias from CACHES, None disables the shared tier
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS')
@@ -13,10 +13,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (SpectacularAPIView, SpectacularSwaggerView)
 
+from core.metrics import metrics_view
+from core.views import HealthView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Swagger api docs
@@ -24,7 +29,21 @@ urlpatterns = [
     # Build docs as view using api schema url
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'),
          name='api-docs'),
+    # Database and connection pool health
+    path('api/health/', HealthView.as_view(), name='health'),
+    # Prometheus scrape target, internal networks only
+    path('metrics', metrics_view, name='metrics'),
     path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls'))
+    path('api/recipe/', include('recipe.urls')),
+    # Background job status
+    path('api/job/', include('core.urls')),
 
 ]
+
+# Serve uploads from the development server, production serves them
+# from the media volume directly
+if settings.DEBUG:
+    urlpatterns += static(
+        settings.MEDIA_URL,
+        document_root=settings.MEDIA_ROOT,
+    )
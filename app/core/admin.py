@@ -7,6 +7,8 @@ from core import models
 # import translation system utilities
 from django.utils.translation import gettext_lazy as _
 
+from recipe.cache import bump_data_version
+
 
 # Register your models here.
 
@@ -51,7 +53,37 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class UserDataAdmin(admin.ModelAdmin):
+    """Admin for user owned rows, bumping the owner's data version.
+
+    Cached responses and conditional GET validators are keyed on it.
+    """
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_data_version(obj.user_id)
+        # Moving a row to another user changes both users' data
+        previous = form.initial.get('user')
+        if previous and previous != obj.user_id:
+            bump_data_version(previous)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        bump_data_version(form.instance.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_data_version(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            bump_data_version(user_id)
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+admin.site.register(models.Recipe, UserDataAdmin)
+admin.site.register(models.Tag, UserDataAdmin)
+admin.site.register(models.Ingredient, UserDataAdmin)
+admin.site.register(models.Job)
@@ -1,6 +1,48 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        """Connect signal handlers once the app registry is loaded."""
+        from rest_framework.authtoken.models import Token
+
+        from core import authentication, metrics, signals
+        # Imported for the system checks it registers
+        from core import checks  # noqa: F401
+
+        # Count and time queries for the request metrics
+        connection_created.connect(metrics.install_query_recorder,
+                                   dispatch_uid='core.record_queries')
+
+        # Keep the token authentication cache in step with the database
+        post_save.connect(authentication.invalidate_user_tokens,
+                          sender=self.get_model('User'),
+                          dispatch_uid='core.invalidate_user_tokens')
+        post_delete.connect(authentication.invalidate_deleted_token,
+                            sender=Token,
+                            dispatch_uid='core.invalidate_deleted_token')
+
+        # New users start with a data version
+        post_save.connect(signals.user_created,
+                          sender=self.get_model('User'),
+                          dispatch_uid='core.user_created')
+
+        # Keep recipe modification times in step with their relations
+        recipe = self.get_model('Recipe')
+        for field_name in ('tags', 'ingredients'):
+            m2m_changed.connect(
+                signals.recipe_relations_changed,
+                sender=getattr(recipe, field_name).through,
+                dispatch_uid=f'core.recipe_{field_name}_changed')
+        for model_name in ('Tag', 'Ingredient'):
+            model = self.get_model(model_name)
+            post_save.connect(signals.recipe_attr_changed, sender=model,
+                              dispatch_uid=f'core.{model_name}_saved')
+            pre_delete.connect(signals.recipe_attr_changed, sender=model,
+                               dispatch_uid=f'core.{model_name}_deleted')
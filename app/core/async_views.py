@@ -0,0 +1,159 @@
+"""
+Async entry points for read-heavy API views under ASGI.
+
+Django 3.2 has no async ORM and DRF views are synchronous, so the async
+view returned here hands reads to a bounded pool of worker threads that
+query concurrently. Under ASGI a slow client then only costs a coroutine
+while its request or response is in flight, rather than holding the one
+thread Django runs every synchronous view on. The ASGI handler here also
+keeps streamed bodies, such as the recipe export, off the event loop.
+"""
+import asyncio
+import contextvars
+import functools
+import gc
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+import django
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import close_old_connections, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+
+
+def _read_executor():
+    """Return the thread pool shared by async reads."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_WORKERS,
+            thread_name_prefix='async-read')
+    return _executor
+
+
+def shutdown_read_executor():
+    """Stop the read threads, dropping their persistent connections."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        # Connection wrappers hold reference cycles, so the connections
+        # of exited threads are only closed once the cycles are collected
+        gc.collect()
+
+
+def _run_read(view, request, *args, **kwargs):
+    """Run a read view to a rendered response in a worker thread."""
+    # Each worker keeps its own connection, so honour CONN_MAX_AGE here
+    # as request_started and request_finished would for a sync view
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+class AsyncReadMixin:
+    """Serve safe methods from an async view when ASYNC_VIEWS is on.
+
+    Writes still run on Django's thread sensitive executor, exactly as
+    they would for a synchronous view under ASGI.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        """Return an async view wrapping the regular view."""
+        view = super().as_view(*args, **kwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            if request.method in SAFE_METHODS:
+                # Carry context variables, such as the request metrics,
+                # into the worker thread as sync_to_async does
+                context = contextvars.copy_context()
+                return await asyncio.get_running_loop().run_in_executor(
+                    _read_executor(), functools.partial(
+                        context.run, _run_read, view, request,
+                        *args, **kwargs))
+            return await sync_to_async(view)(request, *args, **kwargs)
+
+        return async_view
+
+
+def _close_stream(response):
+    """Close a streamed response and the connection of its thread."""
+    try:
+        response.close()
+    finally:
+        # The thread exits next, so its connection cannot be reused
+        connections.close_all()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGI handler consuming streaming responses off the event loop.
+
+    Django 3.2 iterates them on the loop itself, where a body generated
+    lazily from a queryset raises SynchronousOnlyOperation. Each one is
+    consumed on a thread of its own instead, so its connection and any
+    server side cursor stay on one thread until the response is closed.
+    """
+
+    async def send_response(self, response, send):
+        """Send the response, streaming bodies from a worker thread."""
+        if not response.streaming:
+            return await super().send_response(response, send)
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='asgi-stream')
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': self._response_headers(response),
+            })
+            parts = iter(response)
+            while True:
+                # Parts are always bytes, so None marks the end
+                part = await loop.run_in_executor(
+                    executor, next, parts, None)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            # Closing fires request_finished, also on the stream's thread
+            await loop.run_in_executor(executor, _close_stream, response)
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _response_headers(response):
+        """Return the response headers and cookies as ASGI expects."""
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()]
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip()))
+        return headers
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI handler for the project."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,188 @@
+"""
+Cached token authentication.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUCache:
+    """Thread safe in-process LRU cache with per entry expiry."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value for key or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            # Mark as most recently used
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Store value for ttl seconds, evicting the oldest if full."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+
+# One LRU per process shared by every request thread
+local_cache = LRUCache(settings.TOKEN_AUTH_CACHE_SIZE)
+
+
+def _cache_key(key):
+    """Return the cache key for a token without exposing the token."""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _version_key(cache_key):
+    """Return the shared cache key holding a token's version."""
+    return 'version:' + cache_key
+
+
+def _new_version():
+    """Return a version that cannot collide with an earlier one."""
+    return uuid.uuid4().hex
+
+
+def _shared_cache():
+    """Return the shared cache tier or None if it is disabled."""
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _current_version(shared, cache_key):
+    """Return a token's version, starting one if the shared cache has none."""
+    version_key = _version_key(cache_key)
+    version = shared.get(version_key)
+    if version is None:
+        # add() keeps whichever version another process stored first
+        shared.add(version_key, _new_version(), timeout=None)
+        version = shared.get(version_key)
+    return version
+
+
+def _bump_version(cache_key):
+    """Give a token a new version, orphaning entries in every process."""
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(cache_key)
+        shared.set(_version_key(cache_key), _new_version(), timeout=None)
+
+
+def invalidate_token(key):
+    """Drop a token from every cache tier in every process.
+
+    Entries record the token's version in the shared cache, checked on
+    every hit, so bumping it also retires other processes' LRU entries.
+    Without a shared cache they expire after TOKEN_AUTH_CACHE_TTL.
+    """
+    cache_key = _cache_key(key)
+    local_cache.delete(cache_key)
+    _bump_version(cache_key)
+    # Again on commit, in case another process cached the rows the
+    # change was still replacing
+    transaction.on_commit(lambda: _bump_version(cache_key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token and user lookups.
+
+    Tokens are looked up in an in-process LRU, then in an optional shared
+    cache, and only then in the database. Only the user's id and active
+    flag are cached; other user fields load from the database when first
+    read. Entries live for at most TOKEN_AUTH_CACHE_TTL seconds and are
+    dropped when the token is deleted or its user is saved.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the user and token for key, using the cache if possible."""
+        cache_key = _cache_key(key)
+        ttl = settings.TOKEN_AUTH_CACHE_TTL
+        shared = _shared_cache()
+        # Read before the database, so a change made meanwhile bumps it
+        # past the version stored with the entry
+        version = (_current_version(shared, cache_key)
+                   if shared is not None else None)
+
+        entry = local_cache.get(cache_key)
+        if entry is None and shared is not None:
+            entry = shared.get(cache_key)
+            if entry is not None:
+                local_cache.set(cache_key, entry, ttl)
+        if entry is not None and entry['version'] != version:
+            # Invalidated by another process
+            local_cache.delete(cache_key)
+            entry = None
+
+        if entry is None:
+            # Raises AuthenticationFailed for unknown or inactive users
+            user, token = super().authenticate_credentials(key)
+            entry = {'user_id': user.pk, 'is_active': user.is_active,
+                     'version': version}
+            local_cache.set(cache_key, entry, ttl)
+            if shared is not None:
+                shared.set(cache_key, entry, ttl)
+            return (user, token)
+
+        if not entry['is_active']:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return self._rebuild(key, entry)
+
+    def _rebuild(self, key, entry):
+        """Return a user and token from a cache entry, other fields lazy."""
+        user_model = get_user_model()
+        user = user_model.from_db(
+            None, [user_model._meta.pk.attname, 'is_active'],
+            [entry['user_id'], entry['is_active']])
+        token_model = self.get_model()
+        token = token_model.from_db(None, ['key', 'user_id'],
+                                    [key, entry['user_id']])
+        token.user = user
+        return (user, token)
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop cached tokens for a user when the user is saved."""
+    from rest_framework.authtoken.models import Token
+
+    keys = Token.objects.filter(user_id=instance.pk).values_list(
+        'key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop a cached token when it is deleted."""
+    invalidate_token(instance.key)
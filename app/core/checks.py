@@ -0,0 +1,48 @@
+"""
+System checks for the caches that must be shared by every process.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Cache backends private to one process, whose entries other web
+# workers, the job worker and management commands never see
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _check_shared(setting, purpose, missing_id, local_id):
+    """Return errors unless the cache alias in setting is shared."""
+    alias = getattr(settings, setting)
+    if alias not in settings.CACHES:
+        return [checks.Error(
+            f'{setting} {alias!r} is not in CACHES.', id=missing_id)]
+    if settings.CACHES[alias]['BACKEND'] in LOCAL_CACHE_BACKENDS:
+        return [checks.Error(
+            f'The {alias!r} cache must be shared by every process, '
+            f'or {purpose}.',
+            hint=f'Point {setting} at a shared cache such as Memcached.',
+            id=local_id)]
+    return []
+
+
+@checks.register(checks.Tags.caches)
+def check_pin_cache(app_configs, **kwargs):
+    """Require a pin cache shared by every worker when using replicas."""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    return _check_shared(
+        'REPLICA_PIN_CACHE_ALIAS', 'users can miss their own writes',
+        'core.E001', 'core.E002')
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Require a shared response cache when one is configured."""
+    if settings.RESPONSE_CACHE_ALIAS is None:
+        return []
+    return _check_shared(
+        'RESPONSE_CACHE_ALIAS',
+        'writes made elsewhere leave cached lists and ETags stale',
+        'core.E003', 'core.E004')
@@ -0,0 +1,84 @@
+"""
+Postgres backend with connection health checks and optional pooling.
+
+Set ENGINE to 'core.db' and configure with these extra keys:
+CONN_HEALTH_CHECKS checks a persistent connection is alive before its
+first use in each request, like Django 4.1 does, and POOL, a dict of
+ConnectionPool options, shares connections between threads.
+"""
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Test database handling that releases pooled connections."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the database in use
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Postgres connection wrapper adding health checks and pooling."""
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+        self.connection_pool = None
+
+    def get_pool(self, conn_params):
+        """Return the pool for conn_params, or None when not pooling."""
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        # Keyed on the parameters so the test and maintenance databases
+        # never share connections with the main one
+        key = tuple(sorted((k, str(v)) for k, v in conn_params.items()))
+        return get_pool(key, self.alias,
+                        health_checks=self.health_check_enabled, **options)
+
+    def get_new_connection(self, conn_params):
+        pool = self.connection_pool = self.get_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params))
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.connection_pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.connection_pool.release(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Check again before the connection is next used
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        """Close a reused connection that no longer works."""
+        if (self.connection is None or not self.health_check_enabled or
+                self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
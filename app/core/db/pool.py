@@ -0,0 +1,179 @@
+"""
+In-process Postgres connection pool.
+
+Django 3.2 opens one connection per thread and closes it at the end of a
+request unless CONN_MAX_AGE keeps it. The pool lets threads hand their
+connection back instead, so request threads and the async read workers
+share a bounded set of warm connections.
+"""
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+# Defaults used when the pool settings are not configured
+DEFAULT_TIMEOUT = 10
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections with usage statistics."""
+
+    def __init__(self, name, max_size, timeout=DEFAULT_TIMEOUT, max_age=None,
+                 health_checks=False):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_checks = health_checks
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self.acquired_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds_total = 0.0
+
+    def _expired(self, connection):
+        """Return True if connection has outlived max_age."""
+        return (self.max_age is not None and
+                time.monotonic() - self._created_at[connection] >=
+                self.max_age)
+
+    def _usable(self, connection):
+        """Return True if an idle connection can be handed out."""
+        if connection.closed or self._expired(connection):
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection):
+        """Close connection and free its slot."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._created_at.pop(connection, None)
+            self._size -= 1
+            self._condition.notify()
+
+    def acquire(self, connect):
+        """Return a connection, calling connect() to open a new one."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts_total += 1
+                        self.wait_seconds_total += time.monotonic() - start
+                        raise psycopg2.OperationalError(
+                            f'Connection pool "{self.name}" exhausted after '
+                            f'waiting {self.timeout}s.')
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    connection = self._idle.pop()
+                else:
+                    connection = None
+                    self._size += 1
+                self.acquired_total += 1
+                self.wait_seconds_total += time.monotonic() - start
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._created_at[connection] = time.monotonic()
+                return connection
+
+            # Checked outside the lock as a health check is a round trip
+            if self._usable(connection):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection):
+        """Return connection to the pool, or close it if unfit for reuse."""
+        if connection not in self._created_at:
+            connection.close()
+            return
+        status = connection.info.transaction_status
+        if (connection.closed or self._expired(connection) or
+                status == extensions.TRANSACTION_STATUS_UNKNOWN):
+            self._discard(connection)
+            return
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self._discard(connection)
+                return
+
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close every idle connection."""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Return the pool metrics."""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'acquired_total': self.acquired_total,
+                'timeouts_total': self.timeouts_total,
+                'wait_seconds_total': self.wait_seconds_total,
+            }
+
+
+def get_pool(key, name, **options):
+    """Return the pool for key, creating it on first use."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(name, **options)
+        return _pools[key]
+
+
+def pool_stats():
+    """Return the metrics of every pool by database alias."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def close_pools():
+    """Close the idle connections of every pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_idle()
@@ -0,0 +1,97 @@
+"""
+Read replica routing with read-your-writes consistency.
+
+Views using ReplicaReadMixin send the queries of safe requests to a
+replica listed in DATABASE_REPLICAS. Everything else, including all
+writes, goes to the primary. A user who writes is pinned to the primary
+for REPLICA_PIN_SECONDS so their next reads cannot miss their own
+changes while the replicas catch up. Pins are kept in the cache named by
+REPLICA_PIN_CACHE_ALIAS, which must be shared by every worker.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def _replicas():
+    """Return the aliases of the configured replicas."""
+    return settings.DATABASE_REPLICAS
+
+
+def _pin_key(user_id):
+    """Return the cache key marking a user as pinned to the primary."""
+    return f'db-pin:{user_id}'
+
+
+def _pin_cache_alias():
+    """Return the alias of the cache holding the pins."""
+    return settings.REPLICA_PIN_CACHE_ALIAS
+
+
+def pin_to_primary(user_id):
+    """Send a user's reads to the primary for the pin window."""
+    caches[_pin_cache_alias()].set(
+        _pin_key(user_id), True,
+        settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    """Return True if a user wrote within the pin window."""
+    return caches[_pin_cache_alias()].get(_pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    """Route reads to a replica while a view has enabled it."""
+
+    def db_for_read(self, model, **hints):
+        """Pick a replica for reads made by a replica enabled request."""
+        replicas = _replicas()
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        """Always write to the primary."""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between rows of the primary and its replicas."""
+        databases = {'default', *_replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary, replicas follow it."""
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from replicas unless the user just wrote."""
+
+    def dispatch(self, request, *args, **kwargs):
+        """Reset replica routing around each request."""
+        token = _use_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        """Choose where the request reads from once the user is known."""
+        super().initial(request, *args, **kwargs)
+        if not _replicas() or not request.user.is_authenticated:
+            return
+
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request.user.pk)
+        elif not is_pinned(request.user.pk):
+            _use_replica.set(True)
@@ -0,0 +1,127 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 is deliberately slow, so a burst of logins or signups hashing
+inline can take every core from the rest of the API. Here hashes are
+computed on a bounded thread or process pool, by default half the
+cores, leaving the others to recipe traffic. Callers still block until
+their hash is done. Requests wait a short while for a free slot and are
+turned away with a 503 once too many are pending.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class HashingUnavailable(APIException):
+    """Raised when too many password hashes are already pending."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign ins in progress, try again shortly.'
+    default_code = 'hashing_unavailable'
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count set by PASSWORD_HASH_ITERATIONS.
+
+    Hashes made at another cost are upgraded on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS',
+                       hashers.PBKDF2PasswordHasher.iterations)
+
+
+def _mode():
+    """Return the configured executor mode."""
+    return settings.PASSWORD_HASH_EXECUTOR
+
+
+def _workers():
+    """Return the number of hashing workers."""
+    return settings.PASSWORD_HASH_WORKERS
+
+
+def _init_process():
+    """Set up Django in a freshly spawned hashing process."""
+    import django
+    django.setup()
+
+
+def _get_executor():
+    """Return the shared executor and its slots, creating them once."""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            if _mode() == 'process':
+                _executor = ProcessPoolExecutor(
+                    max_workers=_workers(), initializer=_init_process)
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_workers(), thread_name_prefix='hashing')
+            # Bound queued and running hashes so bursts are shed early
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_MAX_PENDING)
+        return _executor, _slots
+
+
+def shutdown_executor():
+    """Stop the hashing pool so the next hash builds a new one."""
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor = _slots = None
+
+
+def _run(func, *args):
+    """Run func on the hashing pool, or inline when the pool is off.
+
+    The calling thread blocks until the result is ready.
+    """
+    if _mode() == 'inline':
+        return func(*args)
+
+    executor, slots = _get_executor()
+    if not slots.acquire(
+            timeout=settings.PASSWORD_HASH_WAIT):
+        raise HashingUnavailable()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def make_password(password):
+    """Return the hash of password, computed on the hashing pool."""
+    if password is None:
+        # Unusable passwords are random markers and cost nothing
+        return hashers.make_password(None)
+    return _run(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """Return True if password matches encoded, rehashing if outdated."""
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+
+    is_correct = _run(hashers.check_password, password, encoded)
+    if is_correct and setter is not None:
+        preferred = hashers.get_hasher('default')
+        try:
+            hasher = hashers.identify_hasher(encoded)
+        except ValueError:
+            return is_correct
+        if (hasher.algorithm != preferred.algorithm or
+                preferred.must_update(encoded)):
+            setter(password)
+    return is_correct
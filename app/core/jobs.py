@@ -0,0 +1,155 @@
+"""
+Background jobs stored in Postgres.
+
+Jobs are rows in core.Job, inserted in the same transaction as the data
+they act on. Workers (manage.py run_worker) claim them with
+UPDATE ... FOR UPDATE SKIP LOCKED, so any number of worker processes and
+threads share the queue without running a job twice and without a
+broker. NOTIFY wakes idle workers as soon as a job commits.
+
+Tasks are plain functions taking the claimed Job, registered with
+@task in an app's tasks module.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel idle workers LISTEN on
+NOTIFY_CHANNEL = 'core_jobs'
+
+_tasks = {}
+
+
+class UnknownTask(KeyError):
+    """Raised for a job name no tasks module registered."""
+
+
+def task(name, max_attempts=None):
+    """Register the decorated function as the task for name."""
+    def decorator(func):
+        func.max_attempts = max_attempts
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    """Return the function registered for name."""
+    if name not in _tasks:
+        # Import every installed app's tasks module once
+        autodiscover_modules('tasks')
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownTask(name)
+
+
+def _write_alias():
+    """Return the database alias jobs are written to."""
+    return router.db_for_write(Job)
+
+
+def enqueue(name, payload=None, user=None, delay=0, max_attempts=None):
+    """Queue a job to run name with payload, returning the Job.
+
+    The job is only visible to workers once the current transaction
+    commits, so it never runs against data that was rolled back.
+    """
+    func = get_task(name)
+    if max_attempts is None:
+        max_attempts = func.max_attempts or settings.JOB_MAX_ATTEMPTS
+
+    alias = _write_alias()
+    job = Job.objects.using(alias).create(
+        name=name, payload=payload or {}, user=user,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay))
+    # Postgres delivers notifications on commit and drops them on rollback
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'NOTIFY {NOTIFY_CHANNEL}')
+    return job
+
+
+def claim(worker_id, limit=1):
+    """Lock and return up to limit due jobs for worker_id.
+
+    One statement, so rows are locked and marked running atomically.
+    Rows other workers hold are skipped rather than waited on.
+    """
+    table = Job._meta.db_table
+    now = timezone.now()
+    return list(Job.objects.db_manager(_write_alias()).raw(
+        f'UPDATE {table} SET status = %s, attempts = attempts + 1, '
+        f'locked_at = %s, locked_by = %s, updated_at = %s '
+        f'WHERE id IN ('
+        f'SELECT id FROM {table} WHERE status = %s AND run_at <= %s '
+        f'ORDER BY run_at, id LIMIT %s FOR UPDATE SKIP LOCKED) '
+        f'RETURNING *',
+        [Job.RUNNING, now, worker_id, now, Job.QUEUED, now, limit]))
+
+
+def retry_delay(attempts):
+    """Return seconds to wait before retrying after attempts tries."""
+    base = settings.JOB_RETRY_DELAY
+    return base * 2 ** (attempts - 1)
+
+
+def _finish(job, **fields):
+    """Record the outcome of a claimed job if the worker still owns it."""
+    now = timezone.now()
+    # A job whose lock went stale may have been claimed by another
+    # worker, whose outcome wins
+    return Job.objects.using(_write_alias()).filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by,
+    ).update(locked_at=None, updated_at=now, **fields)
+
+
+def run(job):
+    """Run a claimed job and record success, a retry or failure."""
+    try:
+        result = get_task(job.name)(job)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning('Job %s failed, retrying in %ss', job.pk, delay,
+                           exc_info=True)
+            _finish(job, status=Job.QUEUED, locked_by='', error=error,
+                    run_at=timezone.now() + timedelta(seconds=delay))
+        else:
+            logger.exception('Job %s failed', job.pk)
+            _finish(job, status=Job.FAILED, error=error,
+                    finished_at=timezone.now())
+        return False
+
+    _finish(job, status=Job.SUCCEEDED, result=result, error='',
+            finished_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """Return jobs whose worker died mid run to the queue.
+
+    Returns the number of jobs requeued or failed.
+    """
+    now = timezone.now()
+    timeout = settings.JOB_LOCK_TIMEOUT
+    stale = Job.objects.using(_write_alias()).filter(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+    # The lost run already counted as an attempt
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_at=None, finished_at=now, updated_at=now,
+        error='Worker lost while running the job.')
+    requeued = stale.update(status=Job.QUEUED, locked_at=None, locked_by='',
+                            run_at=now, updated_at=now)
+    return failed + requeued
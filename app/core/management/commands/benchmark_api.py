@@ -0,0 +1,396 @@
+"""
+Django command to benchmark every user and recipe API endpoint.
+"""
+import io
+import json
+import math
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+from core.seeding import seed_data
+
+PASSWORD = 'benchmark-pass-123'
+
+# Percentiles reported for each endpoint
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, pct):
+    """Return the nearest rank percentile of values."""
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def git_commit():
+    """Return the checked out commit, marked if the tree is dirty."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if dirty else commit
+
+
+def jpeg_bytes():
+    """Return a small JPEG for the image upload endpoint."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color='orange').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Scenario:
+    """One endpoint request, built afresh for every iteration."""
+
+    def __init__(self, name, method, url, data=None, fmt='json',
+                 user=None):
+        self.name = name
+        self.method = method
+        # url and data may be callables taking the iteration number
+        self.url = url
+        self.data = data
+        self.fmt = fmt
+        # Callable returning a user to force authenticate as
+        self.user = user
+
+    def request(self, client, iteration):
+        """Send the request and return the fully read response."""
+        url = self.url(iteration) if callable(self.url) else self.url
+        data = self.data(iteration) if callable(self.data) else self.data
+        if self.user is not None:
+            client.force_authenticate(self.user(iteration))
+        try:
+            response = getattr(client, self.method)(
+                url, data, format=self.fmt)
+            if response.streaming:
+                # Time the whole body, not just the first chunk
+                b''.join(response.streaming_content)
+        finally:
+            if self.user is not None:
+                client.force_authenticate(None)
+        return response
+
+
+class Command(BaseCommand):
+    """Seed a dataset and measure every API endpoint.
+
+    Everything runs in a transaction that is rolled back, so the
+    database is left untouched. Results are written as JSON so runs on
+    different commits can be compared with --compare.
+    """
+    help = 'Benchmark the user and recipe APIs on a seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20,
+                            help='Users to seed.')
+        parser.add_argument('--recipes', type=int, default=500,
+                            help='Recipes per user.')
+        parser.add_argument('--tags', type=int, default=30,
+                            help='Tags per user.')
+        parser.add_argument('--ingredients', type=int, default=80,
+                            help='Ingredients per user.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed for the dataset.')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Unmeasured requests per endpoint first.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the response cache between requests '
+                                 'instead of measuring the database path.')
+        parser.add_argument('--only', nargs='+', default=None,
+                            help='Only run endpoints whose name contains '
+                                 'one of these strings.')
+        parser.add_argument('--output',
+                            help='JSON results path. Defaults to '
+                                 'benchmark-<commit>-<time>.json.')
+        parser.add_argument('--compare',
+                            help='Earlier JSON results to compare against.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+        # Thumbnails are queued as jobs, which are rolled back with the
+        # rest, so uploads measure only the request. Reads stay on the
+        # primary, as replicas never see the uncommitted seed
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver'],
+                                   DATABASE_REPLICAS=[],
+                                   MEDIA_ROOT=media_root,
+                                   RECIPE_THUMBNAIL_EXECUTOR='queue'):
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    self.stdout.write('Seeding...')
+                    self._seed(options)
+                    seed_seconds = time.perf_counter() - start
+                    results = self._run_all(options)
+                    transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        results = {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {key: options[key] for key in (
+                'users', 'recipes', 'tags', 'ingredients', 'seed')},
+            'requests': options['requests'],
+            'warm_cache': options['warm_cache'],
+            'seed_seconds': round(seed_seconds, 3),
+            # Kilobytes on Linux
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'endpoints': results,
+        }
+
+        output = options['output'] or 'benchmark-{}-{}.json'.format(
+            results['commit'] or 'local',
+            datetime.now().strftime('%Y%m%d%H%M%S'))
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+        self._report(results, baseline)
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {output}'))
+
+    def _seed(self, options):
+        """Seed the dataset and pick the objects requests act on."""
+        users = seed_data(
+            users=options['users'], recipes=options['recipes'],
+            tags=options['tags'], ingredients=options['ingredients'],
+            seed=options['seed'], email_prefix='benchmark',
+            password=PASSWORD)
+        if not users or not options['recipes']:
+            raise CommandError('Seed at least one user with recipes.')
+
+        self.user = users[0]
+        self.token = Token.objects.create(user=self.user)
+        recipes = list(Recipe.objects.filter(
+            user=self.user).order_by('id').values_list('id', flat=True))
+        self.recipe_id = recipes[0]
+        self.tags = list(Tag.objects.filter(
+            user=self.user).order_by('id').values_list('id', flat=True))
+        self.ingredients = list(Ingredient.objects.filter(
+            user=self.user).order_by('id').values_list('id', flat=True))
+
+        # Every delete needs its own row, one per request and warmup.
+        # They are made apart from the dataset so deletes leave it intact
+        per_endpoint = options['requests'] + options['warmup'] + 1
+        self.deletable = {
+            'recipe': Recipe.objects.bulk_create([
+                Recipe(user=self.user, title=f'Deletable {n}',
+                       time_minutes=1, price=1)
+                for n in range(per_endpoint)]),
+            'tag': Tag.objects.bulk_create([
+                Tag(user=self.user, name=f'Deletable {n}')
+                for n in range(per_endpoint)]),
+            'ingredient': Ingredient.objects.bulk_create([
+                Ingredient(user=self.user, name=f'Deletable {n}')
+                for n in range(per_endpoint)]),
+            'user': seed_data(
+                users=per_endpoint, recipes=0, tags=0, ingredients=0,
+                email_prefix='benchmark-deletable', password=PASSWORD),
+        }
+
+    def _scenarios(self):
+        """Return the requests to measure, covering every endpoint."""
+        recipe_url = reverse('recipe:recipe-detail', args=[self.recipe_id])
+        recipe_payload = {
+            'title': 'Benchmark recipe',
+            'time_minutes': 30,
+            'price': '12.50',
+            'tags': [{'name': 'Dinner'}, {'name': 'Benchmark'}],
+            'ingredients': [{'name': 'Salt'}, {'name': 'Benchmark'}],
+        }
+        image = jpeg_bytes()
+        tag_ids = ','.join(map(str, self.tags[:2]))
+        ingredient_ids = ','.join(map(str, self.ingredients[:2]))
+
+        scenarios = [
+            Scenario('user:create', 'post', reverse('user:create'),
+                     lambda i: {'email': f'benchmark-new-{i}@example.com',
+                                'password': PASSWORD, 'name': 'New'}),
+            Scenario('user:token', 'post', reverse('user:token'),
+                     {'email': self.user.email, 'password': PASSWORD}),
+            Scenario('user:me GET', 'get', reverse('user:me')),
+            Scenario('user:me PATCH', 'patch', reverse('user:me'),
+                     lambda i: {'name': f'Benchmark {i}'}),
+            Scenario('recipe:api-root', 'get', reverse('recipe:api-root')),
+            Scenario('recipe:recipe-list', 'get',
+                     reverse('recipe:recipe-list')),
+            Scenario('recipe:recipe-list ?tags', 'get',
+                     reverse('recipe:recipe-list'), {'tags': tag_ids}),
+            Scenario('recipe:recipe-list ?ingredients', 'get',
+                     reverse('recipe:recipe-list'),
+                     {'ingredients': ingredient_ids}),
+            Scenario('recipe:recipe-list ?search', 'get',
+                     reverse('recipe:recipe-list'), {'search': 'curry'}),
+            Scenario('recipe:recipe-list ?fields', 'get',
+                     reverse('recipe:recipe-list'), {'fields': 'id,title'}),
+            Scenario('recipe:recipe-detail GET', 'get', recipe_url),
+            Scenario('recipe:recipe-list POST', 'post',
+                     reverse('recipe:recipe-list'), recipe_payload),
+            Scenario('recipe:recipe-bulk-create', 'post',
+                     reverse('recipe:recipe-bulk-create'),
+                     [recipe_payload] * 10),
+            Scenario('recipe:recipe-detail PATCH', 'patch', recipe_url,
+                     lambda i: {'title': f'Benchmark {i}'}),
+            Scenario('recipe:recipe-detail PUT', 'put', recipe_url,
+                     recipe_payload),
+            Scenario('recipe:recipe-upload-image', 'post',
+                     reverse('recipe:recipe-upload-image',
+                             args=[self.recipe_id]),
+                     lambda i: {'image': SimpleUploadedFile(
+                         f'{i}.jpg', image, content_type='image/jpeg')},
+                     fmt='multipart'),
+            Scenario('recipe:recipe-export ndjson', 'get',
+                     reverse('recipe:recipe-export')),
+            Scenario('recipe:recipe-export csv', 'get',
+                     reverse('recipe:recipe-export'),
+                     {'export_format': 'csv'}),
+            Scenario('recipe:tag-list', 'get', reverse('recipe:tag-list')),
+            Scenario('recipe:tag-list ?assigned_only', 'get',
+                     reverse('recipe:tag-list'), {'assigned_only': 1}),
+            Scenario('recipe:tag-detail PATCH', 'patch',
+                     reverse('recipe:tag-detail', args=[self.tags[0]]),
+                     lambda i: {'name': f'Benchmark tag {i}'}),
+            Scenario('recipe:ingredient-list', 'get',
+                     reverse('recipe:ingredient-list')),
+            Scenario('recipe:ingredient-detail PATCH', 'patch',
+                     reverse('recipe:ingredient-detail',
+                             args=[self.ingredients[0]]),
+                     lambda i: {'name': f'Benchmark ingredient {i}'}),
+        ]
+
+        for model in ('recipe', 'tag', 'ingredient'):
+            scenarios.append(Scenario(
+                f'recipe:{model}-detail DELETE', 'delete',
+                lambda i, model=model: reverse(
+                    f'recipe:{model}-detail',
+                    args=[self.deletable[model][i].pk])))
+        scenarios.append(Scenario(
+            'user:me DELETE', 'delete', reverse('user:me'),
+            user=lambda i: self.deletable['user'][i]))
+        return scenarios
+
+    def _run_all(self, options):
+        """Measure every scenario, returning results by name."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        results = {}
+        for scenario in self._scenarios():
+            if options['only'] and not any(
+                    part in scenario.name for part in options['only']):
+                continue
+            self.stdout.write(f'Measuring {scenario.name}...')
+            results[scenario.name] = self._measure(client, scenario, options)
+        return results
+
+    def _measure(self, client, scenario, options):
+        """Return latency, query and memory figures for one scenario."""
+        iteration = 0
+        for _ in range(options['warmup']):
+            scenario.request(client, iteration)
+            iteration += 1
+
+        latencies, queries, statuses = [], [], {}
+        for _ in range(options['requests']):
+            if not options['warm_cache']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = scenario.request(client, iteration)
+                latencies.append(time.perf_counter() - start)
+            queries.append(len(captured.captured_queries))
+            statuses[response.status_code] = statuses.get(
+                response.status_code, 0) + 1
+            iteration += 1
+
+        # Measured apart, as tracing allocations slows every request
+        if not options['warm_cache']:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            scenario.request(client, iteration)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        failed = sum(count for code, count in statuses.items()
+                     if code >= 400)
+        if failed:
+            self.stderr.write(f'{scenario.name}: {failed} requests failed '
+                              f'{sorted(statuses)}')
+
+        result = {
+            'method': scenario.method.upper(),
+            'statuses': {str(code): count
+                         for code, count in sorted(statuses.items())},
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+        for pct in PERCENTILES:
+            result[f'p{pct}_ms'] = round(
+                percentile(latencies, pct) * 1000, 3)
+        return result
+
+    def _report(self, results, baseline):
+        """Print a table of results, with changes from baseline."""
+        previous = (baseline or {}).get('endpoints', {})
+        width = max(len(name) for name in results['endpoints']) + 1
+        header = (f'{"endpoint":<{width}} {"p50 ms":>9} {"p95 ms":>9} '
+                  f'{"p99 ms":>9} {"queries":>8} {"peak KB":>9}')
+        if previous:
+            header += f' {"p95 vs base":>12}'
+        self.stdout.write(header)
+
+        for name, result in results['endpoints'].items():
+            line = (f'{name:<{width}} {result["p50_ms"]:>9.2f} '
+                    f'{result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f} '
+                    f'{result["queries_mean"]:>8.1f} '
+                    f'{result["peak_memory_kb"]:>9.1f}')
+            base = previous.get(name)
+            if base and base.get('p95_ms'):
+                change = (result['p95_ms'] / base['p95_ms'] - 1) * 100
+                line += f' {change:>+11.1f}%'
+            self.stdout.write(line)
+
+        if baseline:
+            self.stdout.write(
+                f'Compared with {baseline.get("commit") or "unknown"} '
+                f'run at {baseline.get("created_at")}')
@@ -0,0 +1,65 @@
+"""
+Django command to benchmark password checks per second.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+
+from core import hashing
+
+
+class Command(BaseCommand):
+    """Measure login password checks per second for each executor mode.
+
+    Concurrent clients verify one password through core.hashing, which is
+    what a login costs apart from a single indexed user lookup.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--executor', nargs='+',
+                            default=['inline', 'thread', 'process'],
+                            choices=['inline', 'thread', 'process'],
+                            help='Executor modes to compare.')
+        parser.add_argument('--logins', type=int, default=200,
+                            help='Password checks per mode.')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Clients logging in at once.')
+        parser.add_argument('--iterations', type=int,
+                            help='PBKDF2 iterations, defaults to settings.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['iterations']:
+            settings.PASSWORD_HASH_ITERATIONS = options['iterations']
+        # Waiting is expected here, only the throughput is of interest
+        settings.PASSWORD_HASH_MAX_PENDING = options['concurrency']
+        encoded = hashers.make_password('benchmark-password')
+        cores = os.cpu_count()
+
+        self.stdout.write(f'{hashers.get_hasher().iterations} iterations, '
+                          f'{cores} cores')
+        self.stdout.write(f'{"executor":>10} {"logins/s":>10} '
+                          f'{"per core":>9}')
+        for mode in options['executor']:
+            settings.PASSWORD_HASH_EXECUTOR = mode
+            hashing.shutdown_executor()
+            # Start the pool outside the measurement
+            hashing.check_password('benchmark-password', encoded)
+
+            with ThreadPoolExecutor(options['concurrency']) as clients:
+                start = time.perf_counter()
+                results = list(clients.map(
+                    lambda _: hashing.check_password(
+                        'benchmark-password', encoded),
+                    range(options['logins'])))
+                elapsed = time.perf_counter() - start
+            hashing.shutdown_executor()
+
+            if not all(results):
+                raise CommandError(f'Password check failed with {mode}.')
+            rate = options['logins'] / elapsed
+            self.stdout.write(f'{mode:>10} {rate:>10.1f} {rate / cores:>9.1f}')
@@ -0,0 +1,97 @@
+"""
+Django command to compare API throughput of running servers.
+"""
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Load running servers with concurrent clients and compare them.
+
+    Start the same code under WSGI and ASGI first, for example
+    gunicorn app.wsgi on port 8000 and uvicorn app.asgi on port 8001,
+    then pass each as --target name=url. --slow-clients holds extra
+    connections open with an unfinished request for the whole run.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='Server to load as name=base_url.')
+        parser.add_argument('--path', default='/api/recipe/recipes/',
+                            help='Path requested on every target.')
+        parser.add_argument('--token', default='',
+                            help='API token sent with every request.')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Number of clients in flight at once.')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests sent to each target.')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Idle connections held open meanwhile.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        self.stdout.write(
+            f'{"target":>10} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} '
+            f'{"errors":>7}')
+        for target in options['target']:
+            name, sep, base_url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Expected name=url, got "{target}".')
+            request = Request(base_url.rstrip('/') + options['path'],
+                              headers=headers)
+            slow = self._open_slow_clients(request, options['slow_clients'])
+            try:
+                self._load(name, request, options['concurrency'],
+                           options['requests'])
+            finally:
+                for sock in slow:
+                    sock.close()
+
+    def _open_slow_clients(self, request, count):
+        """Return count sockets that have sent half a request."""
+        url = urlsplit(request.full_url)
+        sockets = []
+        for _ in range(count):
+            sock = socket.create_connection((url.hostname, url.port or 80))
+            sock.sendall(f'GET {url.path} HTTP/1.1\r\n'.encode())
+            sockets.append(sock)
+        return sockets
+
+    def _fetch(self, request):
+        """Return (seconds, ok) for one request."""
+        start = time.perf_counter()
+        try:
+            with urlopen(request, timeout=60) as response:
+                response.read()
+                ok = response.status == 200
+        except (URLError, OSError):
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def _load(self, name, request, concurrency, total):
+        """Send total requests with concurrency clients and report."""
+        # Warm up caches outside the measurement
+        self._fetch(request)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            results = list(pool.map(
+                lambda _: self._fetch(request), range(total)))
+            elapsed = time.perf_counter() - start
+
+        latencies = sorted(seconds * 1000 for seconds, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{name:>10} {total / elapsed:>9.1f} '
+            f'{statistics.median(latencies):>8.1f} {p99:>8.1f} {errors:>7}')
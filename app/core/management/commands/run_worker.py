@@ -0,0 +1,151 @@
+"""
+Django command to run background jobs from the database queue.
+"""
+import os
+import select
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import (
+    close_old_connections, connection, connections, DatabaseError)
+from psycopg2 import OperationalError as Psycopg2Error
+
+from core import jobs
+
+# Seconds between sweeps for jobs whose worker died
+SWEEP_INTERVAL = 60
+# Seconds a thread waits after a database error, doubled after each
+# further error up to MAX_ERROR_DELAY
+ERROR_DELAY = 1
+MAX_ERROR_DELAY = 30
+
+
+class Command(BaseCommand):
+    """Run queued jobs on a pool of worker threads."""
+    help = 'Claim and run background jobs until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help='Jobs run at once by this process.')
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Seconds an idle thread waits before checking the queue '
+                 'when no notification arrives.')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue has no due jobs.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stopping = threading.Event()
+        self.wake = threading.Event()
+        self.burst = options['burst']
+        self.poll_interval = options['poll_interval']
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        # Finish running jobs and exit on SIGTERM or Ctrl+C
+        handlers = {signum: signal.signal(signum, self._stop)
+                    for signum in (signal.SIGTERM, signal.SIGINT)}
+
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self._work, args=(f'{prefix}:{n}',),
+                             name=f'job-worker-{n}', daemon=True)
+            for n in range(options['concurrency'])
+        ]
+        self.stdout.write(
+            f'Worker {prefix} running {len(threads)} threads...')
+        for thread in threads:
+            thread.start()
+
+        jobs.requeue_stale()
+        if not self.burst:
+            self._listen()
+        for thread in threads:
+            thread.join()
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped after {self.processed} jobs.'))
+
+    def _stop(self, signum, frame):
+        """Stop claiming jobs and wake idle threads so they exit."""
+        self.stopping.set()
+        self.wake.set()
+
+    def _listen(self):
+        """Wake idle threads on job notifications, sweeping stale locks."""
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {jobs.NOTIFY_CHANNEL}')
+        raw = connection.connection
+        swept = time.monotonic()
+        try:
+            while not self.stopping.is_set():
+                # Sleep until a notification arrives or the poll interval
+                # ends, whichever is first
+                ready, _, _ = select.select([raw], [], [],
+                                            self.poll_interval)
+                if ready:
+                    raw.poll()
+                    raw.notifies.clear()
+                    self.wake.set()
+                if time.monotonic() - swept > SWEEP_INTERVAL:
+                    jobs.requeue_stale()
+                    swept = time.monotonic()
+        except (OSError, DatabaseError, Psycopg2Error):
+            # Threads fall back to polling if the listener loses its
+            # connection
+            if not self.stopping.is_set():
+                self.stderr.write('Lost the notification connection, '
+                                  'polling instead.')
+                self.stopping.wait()
+        finally:
+            # Pooled connections are reused, so stop listening first
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('UNLISTEN *')
+            except DatabaseError:
+                pass
+            connection.close()
+
+    def _work(self, worker_id):
+        """Claim and run jobs one at a time until stopped."""
+        delay = ERROR_DELAY
+        try:
+            while not self.stopping.is_set():
+                try:
+                    # Honour CONN_MAX_AGE between jobs as a request would
+                    close_old_connections()
+                    claimed = jobs.claim(worker_id)
+                    for job in claimed:
+                        jobs.run(job)
+                        with self.lock:
+                            self.processed += 1
+                except (DatabaseError, Psycopg2Error) as error:
+                    # Keep the thread through restarts and failovers. A
+                    # job it held is requeued once its lock goes stale
+                    self.stderr.write(
+                        f'{worker_id}: database error, retrying in '
+                        f'{delay:g}s: {str(error).strip()}')
+                    connections.close_all()
+                    self.stopping.wait(delay)
+                    delay = min(delay * 2, MAX_ERROR_DELAY)
+                    continue
+                delay = ERROR_DELAY
+                if not claimed:
+                    if self.burst:
+                        return
+                    self.wake.wait(self.poll_interval)
+                    self.wake.clear()
+        finally:
+            connections.close_all()
@@ -0,0 +1,119 @@
+"""
+Django command to seed a large synthetic dataset for load testing.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import seeding
+from core.models import Recipe, Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """Generate users with recipes, tags, ingredients and their links.
+
+    Recipes and links are loaded with Postgres COPY by default, so
+    millions of rows take minutes. --drop-foreign-keys speeds this up on
+    a database no one else is using. The same options and seed always
+    give the same data.
+    """
+    help = 'Seed deterministic synthetic recipes for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100,
+                            help='Users to create.')
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user.')
+        parser.add_argument('--tags', type=int, default=30,
+                            help='Tags per user.')
+        parser.add_argument('--ingredients', type=int, default=80,
+                            help='Ingredients per user.')
+        parser.add_argument('--tags-per-recipe', type=int, default=3,
+                            help='Tags linked to each recipe.')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5,
+                            help='Ingredients linked to each recipe.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed for the dataset.')
+        parser.add_argument('--email-prefix', default='seed',
+                            help='Users get <prefix>-<n>@example.com.')
+        parser.add_argument('--password', default='seed-pass-123',
+                            help='Password shared by every seeded user.')
+        parser.add_argument('--method', choices=seeding.METHODS,
+                            default='copy',
+                            help='Load rows with COPY or bulk INSERTs.')
+        parser.add_argument('--batch-size', type=int,
+                            default=seeding.DEFAULT_BATCH_SIZE,
+                            help='Recipes written per batch.')
+        parser.add_argument('--drop-foreign-keys', action='store_true',
+                            help='Drop the foreign keys of the recipe '
+                                 'tables while loading. Faster, but locks '
+                                 'those tables until the end, so it is '
+                                 'refused while other clients are '
+                                 'connected.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['method'] == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY needs Postgres, use --method bulk.')
+        if options['drop_foreign_keys']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--drop-foreign-keys needs Postgres.')
+            # The dropped keys lock the tables against every other client
+            # for the whole load
+            sessions = seeding.other_sessions()
+            if sessions:
+                raise CommandError(
+                    f'{sessions} other clients are connected to the '
+                    f'database and would be blocked until seeding ends. '
+                    f'Stop them or seed without --drop-foreign-keys.')
+        prefix = options['email_prefix']
+        if get_user_model().objects.filter(
+                email=f'{prefix}-0@example.com').exists():
+            raise CommandError(
+                f'Users with the prefix {prefix!r} already exist, '
+                f'choose another --email-prefix.')
+
+        total = options['users'] * options['recipes']
+        self.stdout.write(
+            f'Seeding {options["users"]} users with {total} recipes '
+            f'using {options["method"]}...')
+        start = time.perf_counter()
+
+        def progress(done):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'  {done}/{total} recipes, '
+                f'{done / elapsed:.0f} recipes/s', ending='\r')
+            self.stdout.flush()
+
+        seeding.seed_data(
+            users=options['users'], recipes=options['recipes'],
+            tags=options['tags'], ingredients=options['ingredients'],
+            tags_per_recipe=options['tags_per_recipe'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            seed=options['seed'], email_prefix=prefix,
+            password=options['password'], batch_size=options['batch_size'],
+            method=options['method'], progress=progress,
+            drop_foreign_keys=options['drop_foreign_keys'])
+        elapsed = time.perf_counter() - start
+        if total:
+            self.stdout.write('')
+
+        # Fresh statistics so the planner sees the new row counts
+        models = [get_user_model(), Recipe, Tag, Ingredient,
+                  Recipe.tags.through, Recipe.ingredients.through]
+        tables = ', '.join(connection.ops.quote_name(model._meta.db_table)
+                           for model in models)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {tables}')
+
+        links = total * (
+            min(options['tags_per_recipe'], options['tags']) +
+            min(options['ingredients_per_recipe'], options['ingredients']))
+        rows = (options['users'] * (1 + options['tags'] +
+                                    options['ingredients']) + total + links)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {rows} rows ({total} recipes, {links} links) in '
+            f'{elapsed:.1f}s, {rows / max(elapsed, 1e-9):.0f} rows/s.'))
@@ -1,37 +1,117 @@
 """
 Django command to wait for DB to be available.
 """
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2Error
-from django.core.management.base import BaseCommand
+
+# Factor the delay grows by after each failed attempt
+BACKOFF = 2
+
+
+def probe(alias, timeout):
+    """Connect to the database alias and run a trivial query.
+
+    A plain driver connection, skipping any pool and session setup, that
+    gives up connecting after timeout seconds.
+    """
+    connection = connections[alias]
+    params = connection.get_connection_params()
+    params['connect_timeout'] = max(1, math.ceil(timeout))
+    with closing(connection.Database.connect(**params)) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def describe(error):
+    """Return the first line of an error's message."""
+    lines = str(error).strip().splitlines()
+    return lines[0] if lines else type(error).__name__
 
 
 class Command(BaseCommand):
-    """Django command to wait for database."""
+    """Django command to wait for database.
+
+    Every configured database is probed in parallel, retrying with
+    exponential backoff until it accepts queries. Exits non-zero if any
+    is still unavailable after the timeout.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', dest='databases', nargs='+',
+            help='Database aliases to wait for, defaults to all.')
+        parser.add_argument(
+            '--timeout', type=float,
+            default=settings.DB_WAIT_TIMEOUT,
+            help='Seconds to wait before giving up.')
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.DB_WAIT_INTERVAL,
+            help='Seconds before the first retry.')
+        parser.add_argument(
+            '--max-interval', type=float,
+            default=settings.DB_WAIT_MAX_INTERVAL,
+            help='Longest delay between retries.')
 
     def handle(self, *args, **options):
         """Entrypoint for command."""
-        # standard output to screen
+        aliases = options['databases'] or list(settings.DATABASES)
+        unknown = set(aliases) - set(settings.DATABASES)
+        if unknown:
+            raise CommandError(
+                f'Unknown databases: {", ".join(sorted(unknown))}.')
+
         self.stdout.write('Waiting for database...')
-        # init db status variable
-        db_up = False
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        with ThreadPoolExecutor(len(aliases)) as executor:
+            results = list(executor.map(
+                lambda alias: self._wait(alias, start, deadline, options),
+                aliases))
 
-        # as long as DB not up, keep attempting connection
-        while db_up == False:
-            try:
-                # Check on connected status of default databases
-                self.check(databases=['default'])
-                # if no exception thrown, set db_up to true
-                db_up = True
+        failed = [(alias, error) for alias, _, _, error in results if error]
+        if failed:
+            raise CommandError(
+                f'Database unavailable after {options["timeout"]:g}s: ' +
+                '; '.join(f'{alias}: {error}' for alias, error in failed))
 
-            # If below errors raised
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('DB unavailable. Waiting 1 second...')
-                # wait 1 second
-                time.sleep(1)
+        ready = ', '.join(
+            f'{alias} in {seconds:.2f}s '
+            f'({attempts} attempt{"s" if attempts > 1 else ""})'
+            for alias, seconds, attempts, _ in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! Ready after '
+            f'{time.monotonic() - start:.2f}s: {ready}'))
 
-        # If db is already up
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+    def _wait(self, alias, start, deadline, options):
+        """Probe alias until it answers or the deadline passes.
 
-    # return super().handle(*args, **options)
+        Returns (alias, seconds to ready, attempts, last error or None).
+        """
+        delay = options['interval']
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                probe(alias, deadline - time.monotonic())
+            except (Psycopg2Error, OperationalError) as error:
+                remaining = deadline - time.monotonic()
+                message = describe(error)
+                if remaining <= 0:
+                    return alias, None, attempts, message
+                wait = min(delay, remaining)
+                self.stdout.write(
+                    f'{alias} unavailable ({message}), '
+                    f'retrying in {wait:.2f}s...')
+                time.sleep(wait)
+                delay = min(delay * BACKOFF, options['max_interval'])
+            else:
+                return alias, time.monotonic() - start, attempts, None
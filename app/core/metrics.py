@@ -0,0 +1,271 @@
+"""
+Per-route request metrics exposed in Prometheus text format.
+
+MetricsMiddleware records latency, SQL query count and time, and
+response size per route into histograms. Each thread writes to its own
+shard of counters, so recording a request takes no lock and threads
+never contend; shards are only merged when the metrics are scraped.
+"""
+import asyncio
+import bisect
+import contextvars
+import hmac
+import ipaddress
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from core.db.pool import pool_stats
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets, label names)
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Request latency by route.', LATENCY_BUCKETS,
+        ('method', 'route', 'status')),
+    'http_request_db_queries': (
+        'SQL queries per request by route.', QUERY_BUCKETS,
+        ('method', 'route')),
+    'http_request_db_duration_seconds': (
+        'Time spent in SQL per request by route.', LATENCY_BUCKETS,
+        ('method', 'route')),
+    'http_response_size_bytes': (
+        'Response body size by route.', SIZE_BUCKETS,
+        ('method', 'route')),
+}
+
+# Label for requests that matched no URL, so unknown paths cannot add
+# series without limit
+UNMATCHED_ROUTE = 'unmatched'
+
+# Methods labelled as sent, any other shares one label for the same reason
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                     'OPTIONS'))
+OTHER_METHOD = 'other'
+
+# Query stats of the request running in the current context
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """SQL queries and time spent in them by one request."""
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+class Registry:
+    """Histograms sharded per thread and merged on collection."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+
+    def _shard(self):
+        """Return the calling thread's shard, creating it once."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # The only lock taken, once per thread
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe(self, name, labels, value):
+        """Record value in the histogram name for labels."""
+        buckets = HISTOGRAMS[name][1]
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # Per bucket counts, then one for +Inf, then the sum
+            series = shard[key] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self):
+        """Return {(name, labels): series} merged over every shard."""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            # Copied in one step, as the owning thread may add series
+            for key, series in list(shard.items()):
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = list(series)
+                else:
+                    for index, value in enumerate(series):
+                        total[index] += value
+        return merged
+
+    def clear(self):
+        """Drop every recorded value."""
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's stats."""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Time every query on a new connection, see connection_created."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """Record latency, queries and response size per route."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._async = asyncio.iscoroutinefunction(get_response)
+        if self._async:
+            # Lets Django call this middleware without a thread hop
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self._async:
+            return self.__acall__(request)
+        stats, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._record(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._record(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def _start():
+        """Start collecting stats for a request."""
+        stats = RequestStats()
+        return stats, _request_stats.set(stats), time.perf_counter()
+
+    @staticmethod
+    def _record(request, response, stats, start):
+        """Add a finished request to the histograms."""
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.view_name if match else UNMATCHED_ROUTE
+        method = request.method if request.method in METHODS \
+            else OTHER_METHOD
+        labels = (method, route)
+
+        registry.observe('http_request_duration_seconds',
+                         labels + (str(response.status_code),), elapsed)
+        registry.observe('http_request_db_queries', labels, stats.queries)
+        registry.observe('http_request_db_duration_seconds', labels,
+                         stats.db_seconds)
+        # Streamed bodies are never held in memory, so are not measured
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', labels,
+                             len(response.content))
+
+
+def _escape(value):
+    """Escape a label value for the text format."""
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _labels(names, values, extra=()):
+    """Format label pairs as {name="value",...}."""
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_metrics():
+    """Return every metric in Prometheus text format."""
+    collected = registry.collect()
+    lines = []
+    for name, (help_text, buckets, label_names) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, values), series in sorted(collected.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                labels = _labels(label_names, values, [('le', bound)])
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = _labels(label_names, values)
+            lines.append(f'{name}_sum{labels} {series[-1]}')
+            lines.append(f'{name}_count{labels} {cumulative}')
+
+    # Connection pool gauges and counters by database alias
+    stats = pool_stats()
+    fields = sorted({field for pool in stats.values() for field in pool})
+    for field in fields:
+        name = f'db_pool_{field}'
+        kind = 'counter' if field.endswith('_total') else 'gauge'
+        lines.append(f'# TYPE {name} {kind}')
+        for alias, pool in sorted(stats.items()):
+            lines.append(
+                f'{name}{_labels(("database",), (alias,))} {pool[field]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _is_internal(request):
+    """Return True if the request may read the metrics."""
+    token = settings.METRICS_TOKEN
+    if token:
+        # Constant time, so the token cannot be guessed byte by byte, on
+        # bytes since headers may hold non-ASCII characters
+        return hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(),
+            f'Bearer {token}'.encode())
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    networks = settings.METRICS_ALLOWED_NETWORKS
+    return any(address in ipaddress.ip_network(network)
+               for network in networks)
+
+
+def metrics_view(request):
+    """Serve the metrics to scrapers on internal networks."""
+    if not _is_internal(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(),
+                        content_type='text/plain; version=0.0.4')
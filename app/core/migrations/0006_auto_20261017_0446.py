@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:46
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name for the same user."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'),
+                                   ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        column = f'{model_name.lower()}_id'
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'), total=Count('id')).filter(total__gt=1)
+        for group in duplicates:
+            others = model.objects.filter(
+                user=group['user'], name=group['name']
+            ).exclude(id=group['keep'])
+            # Re-point links to the kept row, skipping recipes that
+            # already link to it, then drop the duplicates
+            linked = through.objects.filter(
+                **{column: group['keep']}).values('recipe_id')
+            for other_id in others.values_list('id', flat=True):
+                through.objects.filter(**{column: other_id}).exclude(
+                    recipe_id__in=linked
+                ).update(**{column: group['keep']})
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_auto_20261017_0442'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'updated_at'], name='recipe_user_updated_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_names,
+                             migrations.RunPython.noop),
+    ]
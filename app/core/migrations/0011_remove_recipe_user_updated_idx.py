@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_auto_20261017_0535'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_user_updated_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_remove_recipe_user_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        # Data written before versions were stored counts as changed now
+        migrations.RunSQL(
+            'INSERT INTO core_dataversion (user_id, version, modified) '
+            'SELECT id, 0, now() FROM core_user',
+            migrations.RunSQL.noop),
+    ]
@@ -1,12 +1,28 @@
 """Database models."""
+import os
+import uuid
+
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin)
 
+from core import hashing
+
 # Create your models here.
 
 
+def recipe_image_file_path(instance, filename):
+    """Generate file path for new recipe image."""
+    ext = os.path.splitext(filename)[1].lower()
+    filename = f'{uuid.uuid4()}{ext}'
+
+    return os.path.join('uploads', 'recipe', filename)
+
+
 class UserManager(BaseUserManager):
     """Manager for users."""
 
@@ -55,6 +71,20 @@ class User(AbstractBaseUser, PermissionsMixin):
     # Defines default field used for authentication
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        """Hash and set the password on the hashing pool."""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Verify the password on the hashing pool, rehashing if needed."""
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades are not password changes
+            self._password = None
+            self.save(update_fields=['password'])
+        return hashing.check_password(raw_password, self.password, setter)
+
 
 class Recipe(models.Model):
     """Recipe object."""
@@ -68,6 +98,28 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
+    # Bumped on every save and when tags or ingredients change
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title and description lexemes, maintained by a database
+    # trigger whenever either column is written
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Original upload, only ever served from the detail endpoint
+    image = models.ImageField(null=True, blank=True,
+                              upload_to=recipe_image_file_path)
+    # Storage names of the resized renditions by size name, filled in by
+    # the thumbnail workers once an upload has been processed
+    image_thumbnails = models.JSONField(default=dict, blank=True,
+                                        editable=False)
+
+    class Meta:
+        indexes = [
+            # Recipe list: filter(user=...).order_by('-id')
+            models.Index(fields=['user', '-id'],
+                         name='recipe_user_id_desc_idx'),
+            # Full text search: search_vector @@ query
+            GinIndex(fields=['search_vector'],
+                     name='recipe_search_vector_idx'),
+        ]
 
     # Change default print behavior to return title
 
@@ -80,6 +132,15 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Names are unique per user. The index also serves
+            # filter(user=...).order_by('-name') and name lookups
+            models.UniqueConstraint(fields=['user', 'name'],
+                                    name='unique_tag_name_per_user'),
+        ]
 
     def __str__(self):
         return self.name
@@ -90,6 +151,85 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Names are unique per user. The index also serves
+            # filter(user=...).order_by('-name') and name lookups
+            models.UniqueConstraint(fields=['user', 'name'],
+                                    name='unique_ingredient_name_per_user'),
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+
+class Job(models.Model):
+    """Background job stored in the database and run by the worker."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Registered task name, see core.jobs.task
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Owner allowed to read the job's status. Jobs outlive deleted users
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True,
+                             blank=True, on_delete=models.SET_NULL)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    # Incremented each time a worker claims the job
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Not claimed before this time, pushed back between retries
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: status='queued' AND run_at <= now ORDER BY run_at,
+            # id. Partial, so finished jobs never bloat the claim index
+            models.Index(fields=['run_at', 'id'],
+                         condition=models.Q(status='queued'),
+                         name='job_queued_run_at_idx'),
+            # Stale lock sweep over running jobs
+            models.Index(fields=['locked_at'],
+                         condition=models.Q(status='running'),
+                         name='job_running_locked_at_idx'),
+            # Status endpoints: filter(user=...).order_by('-id')
+            models.Index(fields=['user', '-id'],
+                         name='job_user_id_desc_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class DataVersion(models.Model):
+    """Version of a user's recipes, tags and ingredients.
+
+    Bumped by every write to them when no shared cache holds the
+    versions, see recipe/cache.py.
+    """
+    # A plain id, not a foreign key, so writes made while the user is
+    # being deleted can still bump it. User ids are never reused
+    user_id = models.BigIntegerField(primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f'user {self.user_id} v{self.version}'
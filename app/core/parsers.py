@@ -0,0 +1,35 @@
+"""
+Fast JSON parser for the APIs.
+"""
+import codecs
+import io
+
+import orjson
+
+from django.conf import settings
+
+from rest_framework.parsers import JSONParser
+
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """Parse JSON with orjson, matching the results of JSONParser.
+
+    Bodies orjson rejects are parsed again by JSONParser so that error
+    messages and edge cases such as very large integers are unchanged.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+
+        try:
+            if codecs.lookup(encoding).name == 'utf-8':
+                return orjson.loads(body)
+            return orjson.loads(body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
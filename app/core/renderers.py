@@ -0,0 +1,42 @@
+"""
+Fast JSON renderer for the APIs.
+"""
+import orjson
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+# Dict keys are coerced to strings and UTC datetimes end in Z, as DRF does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson, matching the output of JSONRenderer.
+
+    Pretty printed output and non default JSON settings are delegated to
+    JSONRenderer, as is anything orjson cannot encode.
+    """
+
+    def _default(self, obj):
+        """Encode the types orjson does not handle natively."""
+        return encoders.JSONEncoder().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring."""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (data is None or indent is not None or self.ensure_ascii or
+                not self.compact):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default,
+                               option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape line and paragraph separators like JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,302 @@
+"""
+Deterministic synthetic data for benchmarks and load tests.
+
+The same arguments always produce the same users, recipes, tags,
+ingredients and links, so runs seeded on different commits measure the
+same dataset. Rows are written in batches, either with bulk inserts or
+with Postgres COPY, which loads millions of recipes and links in minutes.
+Both methods produce the same data for the same seed.
+"""
+import io
+import random
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import hashing
+from core.models import (DataVersion, Recipe, Tag, Ingredient)
+
+# Rows per INSERT, or recipes per COPY
+DEFAULT_BATCH_SIZE = 5000
+
+METHODS = ('bulk', 'copy')
+
+ADJECTIVES = [
+    'Crispy', 'Spicy', 'Smoky', 'Creamy', 'Zesty', 'Roasted', 'Grilled',
+    'Braised', 'Tangy', 'Sweet', 'Savory', 'Herby', 'Golden', 'Rustic',
+    'Quick', 'Slow cooked', 'Charred', 'Garlicky', 'Lemony', 'Hearty',
+]
+DISHES = [
+    'chicken curry', 'vegetable soup', 'beef stew', 'pasta bake',
+    'fish tacos', 'lentil dal', 'mushroom risotto', 'pork ramen',
+    'tofu stir fry', 'lamb tagine', 'bean chili', 'shrimp paella',
+    'egg fried rice', 'pumpkin pie', 'banana bread', 'apple crumble',
+    'caesar salad', 'falafel wrap', 'margherita pizza', 'pad thai',
+]
+TAG_NAMES = [
+    'Dinner', 'Lunch', 'Breakfast', 'Dessert', 'Vegan', 'Vegetarian',
+    'Gluten free', 'Quick', 'Healthy', 'Comfort food', 'Spicy', 'Baking',
+    'Holiday', 'Budget', 'One pot', 'Meal prep', 'Kids', 'Party',
+    'Summer', 'Winter',
+]
+INGREDIENT_NAMES = [
+    'Salt', 'Pepper', 'Olive oil', 'Butter', 'Garlic', 'Onion', 'Tomato',
+    'Flour', 'Sugar', 'Egg', 'Milk', 'Rice', 'Chicken', 'Beef', 'Tofu',
+    'Lentils', 'Carrot', 'Potato', 'Lemon', 'Ginger', 'Chili', 'Cumin',
+    'Paprika', 'Basil', 'Parsley', 'Coriander', 'Soy sauce', 'Honey',
+    'Cheese', 'Cream', 'Spinach', 'Mushroom', 'Bell pepper', 'Coconut milk',
+    'Chickpeas', 'Pasta', 'Bread', 'Yogurt', 'Cinnamon', 'Vanilla',
+]
+PHRASES = [
+    'Ready in no time.', 'A family favourite.', 'Best served warm.',
+    'Great for leftovers.', 'Freezes well.', 'Perfect for a crowd.',
+    'Pairs well with a green salad.', 'Adjust the spice to taste.',
+]
+
+
+def numbered_names(base, count):
+    """Return count unique names cycling through base."""
+    return [
+        base[n % len(base)] + (f' {n // len(base) + 1}'
+                               if n >= len(base) else '')
+        for n in range(count)
+    ]
+
+
+def _batches(items, size):
+    """Yield lists of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _copy_value(value):
+    """Format a value for the COPY text format."""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_rows(cursor, model, columns, rows):
+    """Load rows of values for columns into the model's table with COPY."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(_copy_value, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    cursor.copy_expert(
+        f'COPY {quote(model._meta.db_table)} '
+        f'({", ".join(map(quote, columns))}) FROM STDIN', buffer)
+
+
+def reserve_ids(cursor, model, count):
+    """Return count new primary keys from the model's id sequence."""
+    cursor.execute(
+        'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+        'FROM generate_series(1, %s)',
+        [model._meta.db_table, model._meta.pk.column, count])
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+@contextmanager
+def foreign_keys_dropped(models):
+    """Drop the models' foreign keys, adding them back on exit.
+
+    Adding a foreign key checks every row in one join, where rows loaded
+    with it in place are each checked on their own at commit. Run this
+    in a transaction, so the keys are restored if anything fails. The
+    tables stay ACCESS EXCLUSIVE locked until it commits, blocking every
+    other session, even readers, for the whole load.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        # Tables with deferred checks still pending cannot be altered
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        dropped = []
+        for model in models:
+            table = quote(model._meta.db_table)
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'", [table])
+            for name, definition in cursor.fetchall():
+                cursor.execute(
+                    f'ALTER TABLE {table} DROP CONSTRAINT {quote(name)}')
+                dropped.append((table, name, definition))
+    yield
+    with connection.cursor() as cursor:
+        for table, name, definition in dropped:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT '
+                           f'{quote(name)} {definition}')
+        cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+
+def other_sessions():
+    """Return how many other clients are connected to the database."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() "
+            "AND backend_type = 'client backend' "
+            "AND pid <> pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+def _create_named(model, users, names, batch_size):
+    """Create one row per user and name, returning the ids by user."""
+    created = model.objects.bulk_create([
+        model(user=user, name=name) for user in users for name in names
+    ], batch_size=batch_size)
+    ids = [obj.pk for obj in created]
+    return {
+        user.pk: ids[n * len(names):(n + 1) * len(names)]
+        for n, user in enumerate(users)
+    }
+
+
+def _recipe_batches(rng, user, recipes, tags, ingredients, tags_per_recipe,
+                    ingredients_per_recipe, batch_size):
+    """Yield one user's recipes a batch at a time.
+
+    Each batch is a list of (title, description, time_minutes, price,
+    link), then the tag and ingredient indexes linked to each recipe.
+    """
+    for batch in _batches(range(recipes), batch_size):
+        fields = [
+            (f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+             ' '.join(rng.sample(PHRASES, 2)),
+             rng.randint(5, 180),
+             Decimal(rng.randint(100, 9999)) / 100,
+             f'https://example.com/recipes/{user.pk}/{n}')
+            for n in batch
+        ]
+        tag_links = [rng.sample(range(tags), tags_per_recipe)
+                     for _ in batch]
+        ingredient_links = [
+            rng.sample(range(ingredients), ingredients_per_recipe)
+            for _ in batch]
+        yield fields, tag_links, ingredient_links
+
+
+def _bulk_recipes(user, fields, tag_links, ingredient_links, tag_ids,
+                  ingredient_ids, batch_size):
+    """Insert a batch of recipes and their links with bulk_create."""
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, title=title, description=description,
+               time_minutes=time_minutes, price=price, link=link)
+        for title, description, time_minutes, price, link in fields
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_ids[index])
+        for recipe, indexes in zip(recipes, tag_links)
+        for index in indexes
+    ], batch_size=batch_size)
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe_id=recipe.pk, ingredient_id=ingredient_ids[index])
+        for recipe, indexes in zip(recipes, ingredient_links)
+        for index in indexes
+    ], batch_size=batch_size)
+
+
+def _copy_recipes(user, fields, tag_links, ingredient_links, tag_ids,
+                  ingredient_ids, now):
+    """Load a batch of recipes and their links with COPY."""
+    with connection.cursor() as cursor:
+        ids = reserve_ids(cursor, Recipe, len(fields))
+        # search_vector is filled in by the trigger, which COPY also fires
+        copy_rows(cursor, Recipe, [
+            'id', 'user_id', 'title', 'description', 'time_minutes',
+            'price', 'link', 'updated_at', 'image', 'image_thumbnails',
+        ], (
+            (recipe_id, user.pk) + row + (now, None, '{}')
+            for recipe_id, row in zip(ids, fields)
+        ))
+        copy_rows(cursor, Recipe.tags.through, ['recipe_id', 'tag_id'], (
+            (recipe_id, tag_ids[index])
+            for recipe_id, indexes in zip(ids, tag_links)
+            for index in indexes
+        ))
+        copy_rows(cursor, Recipe.ingredients.through,
+                  ['recipe_id', 'ingredient_id'], (
+                      (recipe_id, ingredient_ids[index])
+                      for recipe_id, indexes in zip(ids, ingredient_links)
+                      for index in indexes
+                  ))
+
+
+def seed_data(users=10, recipes=100, tags=20, ingredients=50,
+              tags_per_recipe=3, ingredients_per_recipe=5, seed=0,
+              email_prefix='seed', password='seed-pass-123',
+              batch_size=DEFAULT_BATCH_SIZE, method='bulk', progress=None,
+              drop_foreign_keys=False):
+    """Create users, each with recipes, tags and ingredients linked at random.
+
+    recipes, tags and ingredients are per user. Every user shares one
+    password, hashed once. method 'copy' loads recipes and links with
+    Postgres COPY. drop_foreign_keys drops the keys of the recipe and
+    link tables during the load, faster but locking those tables until
+    the end, see foreign_keys_dropped. progress is called with the
+    recipes created so far after each batch. Everything is written in
+    one transaction. Returns the created users.
+    """
+    if method not in METHODS:
+        raise ValueError(f'Unknown seeding method {method!r}.')
+    with transaction.atomic():
+        return _seed(users, recipes, tags, ingredients, tags_per_recipe,
+                     ingredients_per_recipe, seed, email_prefix, password,
+                     batch_size, method, progress, drop_foreign_keys)
+
+
+def _seed(users, recipes, tags, ingredients, tags_per_recipe,
+          ingredients_per_recipe, seed, email_prefix, password, batch_size,
+          method, progress, drop_foreign_keys):
+    """Seed the data, see seed_data."""
+    rng = random.Random(seed)
+    user_model = get_user_model()
+    password_hash = hashing.make_password(password)
+
+    created = user_model.objects.bulk_create([
+        user_model(email=f'{email_prefix}-{n}@example.com',
+                   name=f'Seed user {n}', password=password_hash)
+        for n in range(users)
+    ], batch_size=batch_size)
+    # Bulk creation skips the signal starting each user's data version
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user.pk) for user in created],
+        batch_size=batch_size)
+
+    tag_ids = _create_named(
+        Tag, created, numbered_names(TAG_NAMES, tags), batch_size)
+    ingredient_ids = _create_named(
+        Ingredient, created, numbered_names(INGREDIENT_NAMES, ingredients),
+        batch_size)
+    tags_per_recipe = min(tags_per_recipe, tags)
+    ingredients_per_recipe = min(ingredients_per_recipe, ingredients)
+    now = timezone.now()
+
+    done = 0
+    loaded = [Recipe, Recipe.tags.through, Recipe.ingredients.through]
+    with (foreign_keys_dropped(loaded) if drop_foreign_keys and recipes
+          else nullcontext()):
+        for user in created:
+            batches = _recipe_batches(
+                rng, user, recipes, tags, ingredients, tags_per_recipe,
+                ingredients_per_recipe, batch_size)
+            for fields, tag_links, ingredient_links in batches:
+                if method == 'copy':
+                    _copy_recipes(user, fields, tag_links, ingredient_links,
+                                  tag_ids[user.pk], ingredient_ids[user.pk],
+                                  now)
+                else:
+                    _bulk_recipes(user, fields, tag_links, ingredient_links,
+                                  tag_ids[user.pk], ingredient_ids[user.pk],
+                                  batch_size)
+                done += len(fields)
+                if progress:
+                    progress(done)
+
+    return created
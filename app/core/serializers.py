@@ -0,0 +1,17 @@
+"""
+Serializers for the background job API.
+"""
+from rest_framework import serializers
+
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status."""
+
+    class Meta:
+        model = Job
+        # Payloads and tracebacks are internal, see the admin for those
+        fields = ['id', 'name', 'status', 'attempts', 'max_attempts',
+                  'run_at', 'created_at', 'finished_at', 'result']
+        read_only_fields = fields
@@ -0,0 +1,52 @@
+"""
+Signal handlers keeping recipe modification times current.
+"""
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe.cache import bump_data_version
+
+
+def touch_recipes(queryset):
+    """Set updated_at to now on every recipe in queryset."""
+    queryset.update(updated_at=timezone.now())
+
+
+def user_created(sender, instance, created, **kwargs):
+    """Start a new user's data version, so their data has a change time."""
+    if created:
+        bump_data_version(instance.pk)
+
+
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Touch recipes whose tags or ingredients were added or removed."""
+    if action.startswith('post_'):
+        # Recipes, tags and ingredients all belong to the same user
+        bump_data_version(instance.user_id)
+    if not reverse:
+        # instance is the recipe itself
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        # instance is a tag or ingredient and pk_set holds recipe ids
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        # Recipes must be found before the links are removed
+        touch_recipes(_recipes_using(instance))
+
+
+def recipe_attr_changed(sender, instance, **kwargs):
+    """Touch recipes using a tag or ingredient that was renamed or deleted."""
+    bump_data_version(instance.user_id)
+    # A new row cannot be linked to any recipe yet
+    if kwargs.get('created'):
+        return
+    touch_recipes(_recipes_using(instance))
+
+
+def _recipes_using(instance):
+    """Return the recipes linked to a tag or ingredient."""
+    field_name = {'tag': 'tags', 'ingredient': 'ingredients'}[
+        instance._meta.model_name]
+    return Recipe.objects.filter(**{field_name: instance})
@@ -4,6 +4,9 @@ from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core.models import Recipe
+from recipe.cache import get_data_version
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -47,3 +50,15 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_delete_bumps_data_version(self):
+        """Test deleting a recipe in the admin invalidates the owner's data."""
+        recipe = Recipe.objects.create(user=self.user, title='Sample',
+                                       time_minutes=5, price=5)
+        before = get_data_version(self.user.pk)
+
+        url = reverse("admin:core_recipe_delete", args=[recipe.id])
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertNotEqual(get_data_version(self.user.pk), before)
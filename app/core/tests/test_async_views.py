@@ -0,0 +1,151 @@
+"""
+Tests for the async read views.
+"""
+import asyncio
+import json
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.urls import path, reverse
+from django.test import (
+    AsyncRequestFactory, TransactionTestCase, override_settings)
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.async_views import shutdown_read_executor
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+from user.views import ManageUserView
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    """Test read endpoints served by async views."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc', name='Test')
+        self.token = Token.objects.create(user=self.user)
+        self.factory = AsyncRequestFactory()
+        # Read threads keep connections that would block dropping the
+        # test database
+        self.addCleanup(shutdown_read_executor)
+
+    def _auth(self):
+        """Return the header authenticating as the user."""
+        return {'authorization': f'Token {self.token.key}'}
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_view_when_enabled(self):
+        """Test as_view returns a coroutine function keeping view data."""
+        view = RecipeViewSet.as_view({'get': 'list'})
+
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertIs(view.cls, RecipeViewSet)
+        self.assertTrue(view.csrf_exempt)
+
+    @override_settings(ASYNC_VIEWS=False)
+    def test_sync_view_when_disabled(self):
+        """Test as_view is unchanged when async views are off."""
+        view = RecipeViewSet.as_view({'get': 'list'})
+
+        self.assertFalse(asyncio.iscoroutinefunction(view))
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_list(self):
+        """Test listing recipes through the async view."""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Sample', time_minutes=5,
+            price=Decimal('5.50'))
+        view = RecipeViewSet.as_view({'get': 'list'})
+
+        res = async_to_sync(view)(self.factory.get(
+            '/api/recipe/recipes/', **self._auth()))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [recipe.id])
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_view_writes(self):
+        """Test writes still work through the async view."""
+        view = ManageUserView.as_view()
+
+        res = async_to_sync(view)(self.factory.patch(
+            '/api/user/me/', {'name': 'Updated'},
+            content_type='application/json', **self._auth()))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Updated')
+
+
+def call_asgi(application, url, headers):
+    """Send a GET request through an ASGI application.
+
+    Returns the status code, headers and body of the response.
+    """
+    messages = []
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': url, 'query_string': b'',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        'headers': [(b'host', b'testserver')] + [
+            (name.encode('latin1'), value.encode('latin1'))
+            for name, value in headers.items()],
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(application)(scope, receive, send)
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+
+class ASGIStreamingTests(TransactionTestCase):
+    """Test streamed responses through the project's ASGI application."""
+
+    def setUp(self):
+        from app.asgi import application
+
+        self.application = application
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc', name='Test')
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample', time_minutes=5,
+            price=Decimal('5.50'))
+        self.addCleanup(shutdown_read_executor)
+
+    def _export(self, url):
+        """Export the recipes through the ASGI application."""
+        return call_asgi(self.application, url, {
+            'authorization': f'Token {self.token.key}'})
+
+    def _assert_exported(self, status_code, headers, body):
+        """Check the response streams the user's recipe as NDJSON."""
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers[b'Content-Type'], b'application/x-ndjson')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.recipe.id])
+
+    def test_export(self):
+        """Test the export streams its queryset under ASGI."""
+        self._assert_exported(*self._export(reverse('recipe:recipe-export')))
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_export_async_view(self):
+        """Test the export streams from the async read view under ASGI."""
+        class URLConf:
+            urlpatterns = [
+                path('export/', RecipeViewSet.as_view({'get': 'export'}))]
+
+        with override_settings(ROOT_URLCONF=URLConf):
+            self._assert_exported(*self._export('/export/'))
@@ -0,0 +1,174 @@
+"""
+Tests for cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from django.core.cache import caches
+
+from core.authentication import LRUCache, _cache_key, local_cache
+
+ME_URL = reverse('user:me')
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'token-auth-tests',
+    },
+}
+
+
+def token_queries(queries):
+    """Return the captured queries that read the token table."""
+    return [q for q in queries if 'authtoken_token' in q['sql']]
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are served from cache."""
+
+    def setUp(self):
+        local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc', name='Test')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        """Test a repeated request does not query the token table."""
+        with CaptureQueriesContext(connection) as first:
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as second:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries(first.captured_queries)), 1)
+        self.assertEqual(token_queries(second.captured_queries), [])
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token drops it from the cache."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user drops their tokens from the cache."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_through_manage_user_view_invalidated(self):
+        """Test updating the user through the API refreshes the cache."""
+        self.client.get(ME_URL)
+        res = self.client.patch(ME_URL, {'name': 'Updated'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated')
+
+    @override_settings(CACHES=LOCMEM_CACHES, TOKEN_AUTH_CACHE_ALIAS='shared')
+    def test_shared_tier_used_when_local_empty(self):
+        """Test the shared cache serves tokens missing from the LRU."""
+        self.client.get(ME_URL)
+        # Simulate a request landing on a fresh process
+        local_cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries(ctx.captured_queries), [])
+
+    @override_settings(CACHES=LOCMEM_CACHES, TOKEN_AUTH_CACHE_ALIAS='shared')
+    def test_cached_entry_holds_no_credentials(self):
+        """Test only the user id and active flag are cached."""
+        self.client.get(ME_URL)
+
+        entry = caches['shared'].get(_cache_key(self.token.key))
+
+        self.assertEqual(set(entry), {'user_id', 'is_active', 'version'})
+        self.assertEqual(entry['user_id'], self.user.pk)
+        self.assertEqual(local_cache.get(_cache_key(self.token.key)), entry)
+
+    def test_cached_user_fields_loaded(self):
+        """Test a user rebuilt from the cache still returns every field."""
+        self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data, {'email': 'test@example.com',
+                                    'name': 'Test'})
+
+    @override_settings(CACHES=LOCMEM_CACHES, TOKEN_AUTH_CACHE_ALIAS='shared')
+    def test_invalidation_reaches_other_processes(self):
+        """Test a stale LRU entry is refused once the shared version moves."""
+        self.client.get(ME_URL)
+        cache_key = _cache_key(self.token.key)
+        stale = local_cache.get(cache_key)
+
+        self.user.is_active = False
+        self.user.save()
+        # Another process still holds the entry cached before the save
+        local_cache.set(cache_key, stale, 60)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the in-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full."""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        # Touch a so b becomes the least recently used
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries are not returned after their ttl."""
+        patched_monotonic.return_value = 100
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1, ttl=10)
+
+        patched_monotonic.return_value = 111
+
+        self.assertIsNone(cache.get('a'))
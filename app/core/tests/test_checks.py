@@ -0,0 +1,67 @@
+"""
+Tests for the system checks on shared caches.
+"""
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_pin_cache, check_response_cache
+
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+MEMCACHED = {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': '127.0.0.1:11211',
+}
+
+
+class PinCacheCheckTests(SimpleTestCase):
+    """Test the system check on the replica pin cache."""
+
+    @override_settings(DATABASE_REPLICAS=[], CACHES={'default': LOCMEM})
+    def test_no_replicas(self):
+        """Test any cache will do without replicas."""
+        self.assertEqual(check_pin_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'],
+                       CACHES={'default': LOCMEM})
+    def test_local_cache_with_replicas(self):
+        """Test a per process cache is refused with replicas."""
+        self.assertEqual(
+            [error.id for error in check_pin_cache(None)], ['core.E002'])
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'],
+                       CACHES={'default': LOCMEM, 'shared': MEMCACHED},
+                       REPLICA_PIN_CACHE_ALIAS='shared')
+    def test_shared_cache_with_replicas(self):
+        """Test a shared cache passes with replicas."""
+        self.assertEqual(check_pin_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'],
+                       REPLICA_PIN_CACHE_ALIAS='missing')
+    def test_unknown_cache_alias(self):
+        """Test an alias missing from CACHES is refused."""
+        self.assertEqual(
+            [error.id for error in check_pin_cache(None)], ['core.E001'])
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+    """Test the system check on the response cache."""
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None,
+                       CACHES={'default': LOCMEM})
+    def test_no_response_cache(self):
+        """Test any cache will do when responses are not cached."""
+        self.assertEqual(check_response_cache(None), [])
+
+    @override_settings(RESPONSE_CACHE_ALIAS='default',
+                       CACHES={'default': LOCMEM})
+    def test_local_response_cache(self):
+        """Test a per process response cache is refused."""
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)],
+            ['core.E004'])
+
+    @override_settings(RESPONSE_CACHE_ALIAS='shared',
+                       CACHES={'default': LOCMEM, 'shared': MEMCACHED})
+    def test_shared_response_cache(self):
+        """Test a shared response cache passes."""
+        self.assertEqual(check_response_cache(None), [])
@@ -2,48 +2,100 @@
 Test custom Django management commands.
 """
 
+import threading
+from io import StringIO
 # Import for mocking behavior of DB
-from unittest.mock import patch
+from unittest.mock import ANY, call, patch
 
 # Import Errors that can be used to recoginise DB error
 from psycopg2 import OperationalError as Psycopg2Error
 from django.db.utils import OperationalError
 
 # Allows calling of shell commands
+from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import SimpleTestCase
 
-# Creates a mock to be used as argument in function (patched_check)
+# Creates a mock to be used as argument in function (patched_probe)
 
 
-@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.wait_for_db.probe')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test if database is ready"""
         # Mock response init
-        patched_check.return_value = True
+        patched_probe.return_value = None
 
         # calls wait for db command
-        call_command('wait_for_db')
+        call_command('wait_for_db', databases=['default'], stdout=StringIO())
 
-        # checks that patched command is being called with argument with default db
-        patched_check.assert_called_once_with(databases=["default"])
+        # checks that the default db was probed once, with a timeout
+        patched_probe.assert_called_once_with('default', ANY)
 
     # Replaces sleep object with mock function
     @patch('time.sleep')
-    # patched arguments are applied inside out. patched sleep before patched check
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    # patched arguments are applied inside out. patched sleep before patched probe
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for database when getting OperationalError."""
         # side effect allows mocking multiple times.
-        # This will mock psycopg2error twice, OperErorr 3 times, then return true
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+        # This will mock psycopg2error twice, OperErorr 3 times, then succeed
+        patched_probe.side_effect = [Psycopg2Error] * 2 + \
+            [OperationalError] * 3 + [None]
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', databases=['default'], timeout=60,
+                     interval=0.1, max_interval=2, stdout=StringIO())
 
         # Checks that call_count is equal to 6
-        self.assertEqual(patched_check.call_count, 6)
-        # Check that patched_check was called with default db settings
-        patched_check.assert_called_with(databases=["default"])
+        self.assertEqual(patched_probe.call_count, 6)
+        # Delays double after each failure
+        self.assertEqual(patched_sleep.call_args_list,
+                         [call(0.1), call(0.2), call(0.4), call(0.8),
+                          call(1.6)])
+
+    @patch('time.sleep')
+    def test_wait_for_db_max_interval(self, patched_sleep, patched_probe):
+        """Test delays between attempts stop growing at max_interval."""
+        patched_probe.side_effect = [OperationalError] * 3 + [None]
+
+        call_command('wait_for_db', databases=['default'], timeout=60,
+                     interval=1, max_interval=1.5, stdout=StringIO())
+
+        self.assertEqual(patched_sleep.call_args_list,
+                         [call(1), call(1.5), call(1.5)])
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_probe):
+        """Test an error is raised once the timeout has passed."""
+        patched_probe.side_effect = OperationalError('connection refused')
+
+        with self.assertRaisesMessage(CommandError, 'connection refused'):
+            call_command('wait_for_db', databases=['default'], timeout=0,
+                         stdout=StringIO())
+
+        patched_probe.assert_called_once()
+        patched_sleep.assert_not_called()
+
+    def test_wait_for_db_all_databases_in_parallel(self, patched_probe):
+        """Test every configured database is probed at the same time."""
+        with patch.dict(settings.DATABASES,
+                        {'replica_0': settings.DATABASES['default']}):
+            aliases = sorted(settings.DATABASES)
+            # Each probe waits for the others, so they must run concurrently
+            barrier = threading.Barrier(len(aliases), timeout=5)
+            patched_probe.side_effect = lambda alias, timeout: barrier.wait()
+
+            call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(args[0] for args, _ in patched_probe.call_args_list),
+            aliases)
+
+    def test_wait_for_db_unknown_database(self, patched_probe):
+        """Test an unknown database alias is refused."""
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', databases=['missing'])
+
+        patched_probe.assert_not_called()
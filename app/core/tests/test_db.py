@@ -0,0 +1,162 @@
+"""
+Tests for the database backend, connection pool and health endpoint.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, close_pools
+
+HEALTH_URL = reverse('health')
+
+
+def fake_connection():
+    """Return a stand in for an idle psycopg2 connection."""
+    conn = MagicMock(closed=0)
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def test_released_connection_reused(self):
+        """Test a released connection is handed out again."""
+        pool = ConnectionPool('test', max_size=2)
+        connect = MagicMock(side_effect=fake_connection)
+
+        conn = pool.acquire(connect)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(connect), conn)
+        self.assertEqual(connect.call_count, 1)
+
+    def test_exhausted_pool_times_out(self):
+        """Test acquiring from a full pool fails after the timeout."""
+        pool = ConnectionPool('test', max_size=1, timeout=0.01)
+        pool.acquire(fake_connection)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire(fake_connection)
+
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts_total'], 1)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertGreater(stats['wait_seconds_total'], 0)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting thread receives a connection when one frees."""
+        pool = ConnectionPool('test', max_size=1, timeout=5)
+        conn = pool.acquire(fake_connection)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(fake_connection)))
+        waiter.start()
+
+        pool.release(conn)
+        waiter.join()
+
+        self.assertEqual(acquired, [conn])
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection released mid transaction is rolled back."""
+        pool = ConnectionPool('test', max_size=1)
+        conn = pool.acquire(fake_connection)
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.release(conn)
+
+        conn.rollback.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    @patch('core.db.pool.time.monotonic')
+    def test_old_connection_recycled(self, patched_monotonic):
+        """Test connections past max_age are closed instead of reused."""
+        patched_monotonic.return_value = 100
+        pool = ConnectionPool('test', max_size=1, max_age=60)
+        conn = pool.acquire(fake_connection)
+
+        patched_monotonic.return_value = 161
+        pool.release(conn)
+
+        conn.close.assert_called_once()
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class DatabaseWrapperTests(TestCase):
+    """Test the health checked and pooled database backend."""
+
+    def _wrapper(self, **settings):
+        """Return a separate connection to the test database."""
+        settings_dict = {**connection.settings_dict, **settings}
+        wrapper = DatabaseWrapper(settings_dict, alias=connection.alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _break(self, wrapper):
+        """Close the socket under wrapper as a server restart would."""
+        wrapper.connection.close()
+
+    def test_health_check_replaces_dead_connection(self):
+        """Test a dead persistent connection is replaced before use."""
+        wrapper = self._wrapper(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=60)
+        wrapper.ensure_connection()
+        self._break(wrapper)
+
+        # As the request_started signal does
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_pooled_connection_reused(self):
+        """Test closing a pooled connection returns it for reuse."""
+        self.addCleanup(close_pools)
+        # A distinct application name keeps it out of any shared pool
+        wrapper = self._wrapper(
+            POOL={'max_size': 2}, CONN_MAX_AGE=0,
+            OPTIONS={'application_name': 'pool-test'})
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(wrapper.connection_pool.stats()['in_use'], 1)
+
+
+class HealthApiTests(TestCase):
+    """Test the health endpoint."""
+
+    def test_health_reports_databases_and_pools(self):
+        """Test the endpoint is public and reports each database."""
+        res = APIClient().get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['databases']['default'], 'ok')
+        self.assertIn('pools', res.data)
+
+    def test_health_hides_database_errors(self):
+        """Test failures report a fixed status and log the error."""
+        error = DatabaseError('password authentication failed for "devuser"')
+
+        with patch.object(connection, 'cursor', side_effect=error), \
+                self.assertLogs('core.views', 'ERROR') as logs:
+            res = APIClient().get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['databases']['default'], 'unavailable')
+        self.assertNotIn('devuser', res.content.decode())
+        self.assertIn('devuser', logs.output[0])
@@ -0,0 +1,107 @@
+"""
+Tests for password hashing on the hashing pool.
+"""
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model, hashers
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(PASSWORD_HASH_EXECUTOR='thread', PASSWORD_HASH_WORKERS=2,
+                   PASSWORD_HASH_ITERATIONS=1000)
+class HashingTests(TestCase):
+    """Test passwords are hashed off the request thread."""
+
+    def setUp(self):
+        # Build the pool from this test's settings
+        hashing.shutdown_executor()
+        self.addCleanup(hashing.shutdown_executor)
+        self.client = APIClient()
+
+    def _hashing_threads(self):
+        """Patch make_password to record the threads it runs on."""
+        threads = []
+        make_password = hashers.make_password
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return make_password(*args, **kwargs)
+
+        patcher = patch.object(hashers, 'make_password', side_effect=record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return threads
+
+    def test_signup_hashes_on_pool(self):
+        """Test creating a user hashes the password on a pool thread."""
+        threads = self._hashing_threads()
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'test@example.com', 'password': 'testpass123',
+            'name': 'Test'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('hashing'))
+        user = get_user_model().objects.get(email='test@example.com')
+        self.assertTrue(user.check_password('testpass123'))
+
+    @override_settings(PASSWORD_HASH_EXECUTOR='inline')
+    def test_inline_mode_hashes_on_request_thread(self):
+        """Test inline mode keeps hashing on the calling thread."""
+        threads = self._hashing_threads()
+
+        get_user_model().objects.create_user('test@example.com', 'pass123')
+
+        self.assertEqual(threads, [threading.current_thread().name])
+
+    def test_login_rehashes_at_new_cost(self):
+        """Test logging in upgrades a hash made at an older cost."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.assertIn('$1000$', user.password)
+
+        with self.settings(PASSWORD_HASH_ITERATIONS=1200):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'test@example.com', 'password': 'testpass123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn('$1200$', user.password)
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_wrong_password_not_rehashed(self):
+        """Test a failed login leaves the stored hash alone."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+
+        with self.settings(PASSWORD_HASH_ITERATIONS=1200):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'test@example.com', 'password': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        user.refresh_from_db()
+        self.assertIn('$1000$', user.password)
+
+    @override_settings(PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_WAIT=0.01)
+    def test_full_pool_sheds_logins(self):
+        """Test logins are refused with 503 once the pool is saturated."""
+        get_user_model().objects.create_user('test@example.com', 'pass123')
+        _, slots = hashing._get_executor()
+        slots.acquire()
+        self.addCleanup(slots.release)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@example.com', 'password': 'pass123'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
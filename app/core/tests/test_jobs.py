@@ -0,0 +1,276 @@
+"""
+Tests for the database backed job queue.
+"""
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job
+
+JOBS_URL = reverse('job:job-list')
+
+# Runs recorded by the test tasks, by job id
+runs = []
+runs_lock = threading.Lock()
+
+
+@jobs.task('tests.echo')
+def echo(job):
+    """Record the run and return the payload."""
+    with runs_lock:
+        runs.append(job.pk)
+    return job.payload
+
+
+@jobs.task('tests.fail', max_attempts=2)
+def fail(job):
+    """Always fail."""
+    raise RuntimeError('boom')
+
+
+def detail_url(job_id):
+    """Create and return a job detail URL."""
+    return reverse('job:job-detail', args=[job_id])
+
+
+class JobQueueTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        runs.clear()
+
+    def test_enqueue(self):
+        """Test enqueueing stores a queued job."""
+        job = jobs.enqueue('tests.echo', {'n': 1})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.payload, {'n': 1})
+        self.assertEqual(job.max_attempts, 3)
+
+    def test_enqueue_unknown_task(self):
+        """Test enqueueing an unregistered task raises."""
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('tests.missing')
+
+    def test_claim_marks_running(self):
+        """Test claiming locks due jobs in run order."""
+        first = jobs.enqueue('tests.echo')
+        jobs.enqueue('tests.echo')
+
+        claimed = jobs.claim('worker-1')
+
+        self.assertEqual([job.pk for job in claimed], [first.pk])
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claimed[0].locked_by, 'worker-1')
+
+    def test_claim_skips_future_jobs(self):
+        """Test jobs are not claimed before their run time."""
+        jobs.enqueue('tests.echo', delay=60)
+
+        self.assertEqual(jobs.claim('worker-1'), [])
+
+    def test_run_success(self):
+        """Test a successful run records the result."""
+        job = jobs.enqueue('tests.echo', {'n': 1})
+
+        self.assertTrue(jobs.run(jobs.claim('worker-1')[0]))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'n': 1})
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(runs, [job.pk])
+
+    @override_settings(JOB_RETRY_DELAY=30)
+    def test_run_failure_retries_then_fails(self):
+        """Test failures back off until max_attempts is reached."""
+        job = jobs.enqueue('tests.fail')
+
+        with self.assertLogs('core.jobs', level='WARNING'):
+            self.assertFalse(jobs.run(jobs.claim('worker-1')[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('boom', job.error)
+        self.assertGreater(job.run_at,
+                           timezone.now() + timedelta(seconds=25))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', level='ERROR'):
+            jobs.run(jobs.claim('worker-1')[0])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_doubles(self):
+        """Test the retry delay doubles with each attempt."""
+        with self.settings(JOB_RETRY_DELAY=10):
+            self.assertEqual(
+                [jobs.retry_delay(n) for n in (1, 2, 3)], [10, 20, 40])
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_requeue_stale(self):
+        """Test jobs of dead workers are requeued or failed."""
+        retried = jobs.enqueue('tests.echo')
+        exhausted = jobs.enqueue('tests.fail')
+        jobs.claim('worker-1', limit=2)
+        Job.objects.filter(pk=exhausted.pk).update(attempts=2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, Job.QUEUED)
+        self.assertEqual(exhausted.status, Job.FAILED)
+
+    def test_reclaimed_job_outcome_ignored(self):
+        """Test a worker that lost its lock cannot overwrite the job."""
+        jobs.enqueue('tests.echo')
+        job = jobs.claim('worker-1')[0]
+        Job.objects.filter(pk=job.pk).update(locked_by='worker-2')
+
+        jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+
+class JobConcurrencyTests(TransactionTestCase):
+    """Test workers sharing the queue."""
+
+    def setUp(self):
+        runs.clear()
+
+    def test_locked_jobs_skipped(self):
+        """Test a job locked by another worker is skipped, not waited on."""
+        locked = jobs.enqueue('tests.echo')
+        free = jobs.enqueue('tests.echo')
+        claimed = []
+
+        def claim_other():
+            claimed.extend(jobs.claim('worker-2', limit=2))
+            connection.close()
+
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=locked.pk)
+            thread = threading.Thread(target=claim_other)
+            thread.start()
+            thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([job.pk for job in claimed], [free.pk])
+
+    def test_worker_runs_each_job_once(self):
+        """Test concurrent worker threads run every job exactly once."""
+        ids = {jobs.enqueue('tests.echo', {'n': n}).pk for n in range(20)}
+
+        call_command('run_worker', burst=True, concurrency=4,
+                     stdout=StringIO())
+
+        self.assertEqual(sorted(runs), sorted(ids))
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 20)
+
+    @patch('core.management.commands.run_worker.ERROR_DELAY', 0)
+    def test_worker_survives_database_errors(self):
+        """Test a thread keeps claiming jobs after database errors."""
+        job = jobs.enqueue('tests.echo')
+        errors = [OperationalError('server closed the connection')] * 2
+        claim = jobs.claim
+
+        def flaky_claim(worker_id):
+            if errors:
+                raise errors.pop()
+            return claim(worker_id)
+
+        err = StringIO()
+        with patch('core.jobs.claim', side_effect=flaky_claim):
+            call_command('run_worker', burst=True, concurrency=1,
+                         stdout=StringIO(), stderr=err)
+
+        self.assertEqual(runs, [job.pk])
+        self.assertEqual(err.getvalue().count('database error'), 2)
+
+
+class JobApiTests(TestCase):
+    """Test the job status API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test auth is required to view jobs."""
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_limited_to_user(self):
+        """Test only the user's jobs are listed, newest first."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        jobs.enqueue('tests.echo', user=other)
+        first = jobs.enqueue('tests.echo', user=self.user)
+        second = jobs.enqueue('tests.echo', user=self.user)
+
+        res = self.client.get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['id'] for job in res.data['results']],
+                         [second.pk, first.pk])
+        self.assertNotIn('payload', res.data['results'][0])
+
+    def test_filter_by_status(self):
+        """Test filtering jobs by status."""
+        done = jobs.enqueue('tests.echo', user=self.user)
+        jobs.run(jobs.claim('worker-1')[0])
+        jobs.enqueue('tests.echo', user=self.user)
+
+        res = self.client.get(JOBS_URL, {'status': Job.SUCCEEDED})
+
+        self.assertEqual([job['id'] for job in res.data['results']],
+                         [done.pk])
+
+    def test_filter_by_invalid_status(self):
+        """Test an unknown status is rejected."""
+        res = self.client.get(JOBS_URL, {'status': 'lost'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_job(self):
+        """Test retrieving a job's status and result."""
+        job = jobs.enqueue('tests.echo', {'n': 1}, user=self.user)
+        jobs.run(jobs.claim('worker-1')[0])
+
+        res = self.client.get(detail_url(job.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.SUCCEEDED)
+        self.assertEqual(res.data['result'], {'n': 1})
+
+    def test_retrieve_other_users_job(self):
+        """Test other users' jobs are not found."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        job = jobs.enqueue('tests.echo', user=other)
+
+        res = self.client.get(detail_url(job.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,91 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+SAMPLE = {
+    'id': 1,
+    'title': 'Crème brûlée     "quoted" \\ \n',
+    'price': Decimal('5.25'),
+    'created': datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=timezone.utc),
+    'offset': datetime(2024, 1, 2, 3, 4, 5,
+                       tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    'naive': datetime(2024, 1, 2, 3, 4, 5),
+    'day': date(2024, 1, 2),
+    'at': time(3, 4, 5, 6),
+    'duration': timedelta(minutes=90),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('This field is required.'),
+    'nested': [{'id': 2, 'name': 'Tag'}, None, True, 0.5, -3],
+    7: 'int key',
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test ORJSONRenderer output matches JSONRenderer."""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        """Assert both renderers produce the same bytes for data."""
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type))
+
+    def test_renders_like_json_renderer(self):
+        """Test mixed data renders to identical bytes."""
+        self.assertSameOutput(SAMPLE)
+
+    def test_indented_output_matches(self):
+        """Test pretty printed output is unchanged."""
+        self.assertSameOutput(SAMPLE, 'application/json; indent=4')
+
+    def test_large_integer_falls_back(self):
+        """Test integers orjson cannot encode still render."""
+        self.assertSameOutput({'big': 2 ** 70})
+
+    def test_none_renders_empty(self):
+        """Test None renders as an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test ORJSONParser results match JSONParser."""
+
+    def _parse(self, parser, body):
+        """Parse body with parser."""
+        return parser.parse(io.BytesIO(body))
+
+    def test_parses_like_json_parser(self):
+        """Test a rendered body parses to the same data."""
+        body = JSONRenderer().render(SAMPLE)
+
+        self.assertEqual(self._parse(ORJSONParser(), body),
+                         self._parse(JSONParser(), body))
+
+    def test_large_integer_falls_back(self):
+        """Test integers orjson cannot decode are still parsed."""
+        self.assertEqual(
+            self._parse(ORJSONParser(), b'{"big": 1180591620717411303424}'),
+            {'big': 2 ** 70})
+
+    def test_invalid_json_error_matches(self):
+        """Test malformed bodies raise the same parse error."""
+        errors = []
+        for parser in (ORJSONParser(), JSONParser()):
+            with self.assertRaises(ParseError) as ctx:
+                self._parse(parser, b'{"title": ')
+            errors.append(str(ctx.exception.detail))
+
+        self.assertEqual(errors[0], errors[1])
@@ -0,0 +1,199 @@
+"""
+Tests for the request metrics middleware and endpoint.
+"""
+import re
+import threading
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.async_views import shutdown_read_executor
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_value(text, sample):
+    """Return the value of the sample line starting with sample."""
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test requests are recorded and served in Prometheus format."""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Sample',
+                              time_minutes=5, price=Decimal('5.50'))
+
+    def _scrape(self):
+        """Return the metrics text."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        return res.content.decode()
+
+    def test_request_recorded_by_route(self):
+        """Test latency, queries and size are recorded per route."""
+        res = self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        text = self._scrape()
+
+        labels = '{method="GET",route="recipe:recipe-list"'
+        self.assertEqual(sample_value(
+            text, f'http_request_duration_seconds_count{labels},'
+                  f'status="200"}}'), 2)
+        self.assertGreater(sample_value(
+            text, f'http_request_db_queries_sum{labels}}}'), 0)
+        self.assertGreater(sample_value(
+            text, f'http_request_db_duration_seconds_sum{labels}}}'), 0)
+        self.assertEqual(sample_value(
+            text, f'http_response_size_bytes_sum{labels}}}'),
+            2 * len(res.content))
+
+    def test_buckets_cumulative(self):
+        """Test bucket counts are cumulative and end with +Inf."""
+        self.client.get(RECIPES_URL)
+
+        text = self._scrape()
+
+        counts = [
+            float(value) for value in re.findall(
+                r'^http_request_db_queries_bucket\{method="GET",'
+                r'route="recipe:recipe-list",le="[^"]+"\} (\S+)$',
+                text, re.MULTILINE)]
+        self.assertEqual(len(counts), len(metrics.QUERY_BUCKETS) + 1)
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 1)
+
+    def test_unmatched_paths_share_one_route(self):
+        """Test unknown URLs are recorded under a single label."""
+        self.client.get('/no/such/path/')
+        self.client.get('/another/missing/path/')
+
+        text = self._scrape()
+
+        self.assertEqual(sample_value(
+            text, 'http_request_duration_seconds_count{method="GET",'
+                  'route="unmatched",status="404"}'), 2)
+
+    def test_unknown_methods_share_one_label(self):
+        """Test methods outside the standard set are labelled other."""
+        self.client.generic('BREW', '/no/such/path/')
+        self.client.generic('PROPFIND', '/no/such/path/')
+
+        text = self._scrape()
+
+        self.assertEqual(sample_value(
+            text, 'http_request_duration_seconds_count{method="other",'
+                  'route="unmatched",status="404"}'), 2)
+        self.assertNotIn('BREW', text)
+
+    def test_external_address_forbidden(self):
+        """Test scrapes from outside the internal networks are refused."""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='8.8.8.8')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_private_network_forbidden_by_default(self):
+        """Test the Docker bridge network may not scrape by default."""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='172.17.0.1')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required_when_set(self):
+        """Test a configured token is required, whatever the address."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret',
+                              REMOTE_ADDR='8.8.8.8')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_wrong_token_forbidden(self):
+        """Test a wrong or non-ASCII token is refused."""
+        for header in ('Bearer secre', 'Bearer s\xe9cret'):
+            res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION=header)
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RegistryTests(SimpleTestCase):
+    """Test the sharded histogram registry."""
+
+    def test_threads_merged_on_collect(self):
+        """Test values recorded on many threads are all collected."""
+        registry = metrics.Registry()
+        labels = ('GET', 'route')
+
+        def observe():
+            for _ in range(1000):
+                registry.observe('http_request_db_queries', labels, 3)
+
+        threads = [threading.Thread(target=observe) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        series = registry.collect()[('http_request_db_queries', labels)]
+        self.assertEqual(series[-1], 12000)
+        # 3 falls in the bucket bounded by 5
+        self.assertEqual(series[metrics.QUERY_BUCKETS.index(5)], 4000)
+
+    def test_label_values_escaped(self):
+        """Test quotes and backslashes in label values are escaped."""
+        self.assertEqual(metrics._labels(('route',), ('a"b\\c',)),
+                         '{route="a\\"b\\\\c"}')
+
+
+class AsyncMetricsTests(TransactionTestCase):
+    """Test queries run by async read views are counted."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.token = Token.objects.create(user=self.user)
+        self.addCleanup(shutdown_read_executor)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_read_thread_queries_counted(self):
+        """Test the request's stats reach the read worker thread."""
+        view = RecipeViewSet.as_view({'get': 'list'})
+        request = AsyncRequestFactory().get(
+            RECIPES_URL, authorization=f'Token {self.token.key}')
+
+        async def call():
+            stats, token, _ = metrics.MetricsMiddleware._start()
+            try:
+                response = await view(request)
+            finally:
+                metrics._request_stats.reset(token)
+            return response, stats
+
+        response, stats = async_to_sync(call)()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(stats.queries, 0)
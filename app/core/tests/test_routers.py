@@ -0,0 +1,106 @@
+"""
+Tests for read replica routing.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test safe reads use the replica and writers read their writes."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second alias for the test database stands in for a replica,
+        # only while these tests run. It is added after the class set up,
+        # so queries through it are allowed without declaring it in
+        # databases, which the test runner resolves before any test runs
+        connections.settings['replica'] = {
+            **connections['default'].settings_dict,
+            'TEST': {'MIRROR': 'default'},
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        if hasattr(connections._connections, 'replica'):
+            connections['replica'].close()
+            delattr(connections._connections, 'replica')
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url=RECIPES_URL):
+        """GET url, returning (response, primary sql, replica sql)."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, primary.captured_queries, replica.captured_queries
+
+    def test_safe_read_uses_replica(self):
+        """Test listing recipes reads only from the replica."""
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=Decimal('5.00'))
+
+        res, primary, replica = self._get()
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_write_pins_user_to_primary(self):
+        """Test reads right after a write come from the primary."""
+        payload = {'title': 'Stew', 'time_minutes': 30,
+                   'price': Decimal('8.00')}
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica.captured_queries, [])
+
+        res, primary, replica = self._get()
+
+        self.assertEqual(res.data['results'][0]['title'], 'Stew')
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+    def test_pin_is_per_user(self):
+        """Test one user's write does not pin other users."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        self.client.post(RECIPES_URL, {
+            'title': 'Stew', 'time_minutes': 30, 'price': Decimal('8.00')},
+            format='json')
+        self.client.force_authenticate(other)
+
+        _, primary, replica = self._get(reverse('recipe:tag-list'))
+
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_reads_primary(self):
+        """Test everything uses the primary when no replica is set."""
+        _, primary, replica = self._get()
+
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
@@ -0,0 +1,191 @@
+"""
+Tests for synthetic data seeding and the API benchmark.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import (Recipe, Tag, Ingredient)
+from core.seeding import seed_data
+
+
+def dataset():
+    """Return the seeded recipes with their tag and ingredient names."""
+    return [
+        (recipe.user.email, recipe.title, recipe.price,
+         sorted(tag.name for tag in recipe.tags.all()),
+         sorted(ingredient.name for ingredient in recipe.ingredients.all()))
+        for recipe in Recipe.objects.select_related('user').prefetch_related(
+            'tags', 'ingredients').order_by('id')
+    ]
+
+
+class SeedDataTests(TestCase):
+    """Test seeding users, recipes, tags and ingredients."""
+
+    def test_seed_counts(self):
+        """Test the requested rows and links are created."""
+        users = seed_data(users=2, recipes=5, tags=4, ingredients=6,
+                          tags_per_recipe=2, ingredients_per_recipe=3,
+                          batch_size=2)
+
+        self.assertEqual(len(users), 2)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertEqual(Ingredient.objects.count(), 12)
+        self.assertEqual(Recipe.tags.through.objects.count(), 20)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 30)
+
+    def test_seed_deterministic(self):
+        """Test the same seed produces the same dataset."""
+        seed_data(users=2, recipes=5, seed=7)
+        first = dataset()
+        get_user_model().objects.all().delete()
+
+        seed_data(users=2, recipes=5, seed=7)
+
+        self.assertEqual(dataset(), first)
+
+    def test_seeded_users_can_log_in(self):
+        """Test seeded users share the given password."""
+        users = seed_data(users=2, recipes=0, password='pass123abc')
+
+        user = get_user_model().objects.get(pk=users[1].pk)
+        self.assertTrue(user.check_password('pass123abc'))
+
+    def test_copy_matches_bulk(self):
+        """Test COPY loads the same dataset as bulk inserts."""
+        seed_data(users=2, recipes=5, seed=3, batch_size=2, method='bulk')
+        bulk = dataset()
+        get_user_model().objects.all().delete()
+
+        seed_data(users=2, recipes=5, seed=3, batch_size=2, method='copy')
+
+        self.assertEqual(dataset(), bulk)
+        self.assertFalse(
+            Recipe.objects.filter(search_vector__isnull=True).exists())
+
+    def test_foreign_keys_kept_by_default(self):
+        """Test COPY leaves the foreign keys alone unless asked."""
+        with CaptureQueriesContext(connection) as queries:
+            seed_data(users=1, recipes=3, method='copy')
+
+        self.assertFalse(any('DROP CONSTRAINT' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_copy_restores_foreign_keys(self):
+        """Test foreign keys dropped for COPY are added back."""
+        def foreign_keys():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint WHERE contype = 'f' "
+                    "AND conrelid = %s::regclass ORDER BY conname",
+                    [Recipe.tags.through._meta.db_table])
+                return cursor.fetchall()
+        before = foreign_keys()
+
+        seed_data(users=1, recipes=3, method='copy', drop_foreign_keys=True)
+
+        self.assertEqual(len(before), 2)
+        self.assertEqual(foreign_keys(), before)
+
+    def test_names_unique_beyond_word_list(self):
+        """Test more tags than the word list still get unique names."""
+        seed_data(users=1, recipes=0, tags=50)
+
+        names = list(Tag.objects.values_list('name', flat=True))
+        self.assertEqual(len(set(names)), 50)
+
+
+class SeedCommandTests(TestCase):
+    """Test the seed command."""
+
+    def test_seed_command(self):
+        """Test the requested rows are created."""
+        out = StringIO()
+        call_command('seed', users=2, recipes=4, tags=5, ingredients=6,
+                     tags_per_recipe=2, ingredients_per_recipe=3,
+                     stdout=out)
+
+        self.assertEqual(Recipe.objects.count(), 8)
+        self.assertEqual(Tag.objects.count(), 10)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 24)
+        self.assertIn('8 recipes, 40 links', out.getvalue())
+
+    def test_existing_prefix_refused(self):
+        """Test seeding again with the same email prefix fails."""
+        call_command('seed', users=1, recipes=1, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed', users=1, recipes=1, stdout=StringIO())
+
+    @patch('core.seeding.other_sessions', return_value=2)
+    def test_drop_foreign_keys_refused_with_other_clients(self, patched):
+        """Test dropping keys is refused while others are connected."""
+        with self.assertRaisesMessage(CommandError, '2 other clients'):
+            call_command('seed', users=1, recipes=1, drop_foreign_keys=True,
+                         stdout=StringIO())
+
+        self.assertFalse(Recipe.objects.exists())
+
+    @patch('core.seeding.other_sessions', return_value=0)
+    def test_drop_foreign_keys(self, patched):
+        """Test dropping keys is allowed on an otherwise idle database."""
+        call_command('seed', users=1, recipes=2, drop_foreign_keys=True,
+                     stdout=StringIO())
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+
+class BenchmarkApiCommandTests(TestCase):
+    """Test the API benchmark command."""
+
+    def test_results_saved_and_data_rolled_back(self):
+        """Test results are written as JSON and seeded rows removed."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'benchmark_api', users=1, recipes=3, requests=2, warmup=0,
+                only=['recipe:tag-list', 'user:me'], output=output,
+                stdout=StringIO(), stderr=StringIO())
+
+            with open(output) as file:
+                results = json.load(file)
+
+        endpoints = results['endpoints']
+        self.assertIn('recipe:tag-list', endpoints)
+        self.assertIn('user:me DELETE', endpoints)
+        self.assertNotIn('recipe:recipe-list', endpoints)
+        result = endpoints['recipe:tag-list']
+        self.assertEqual(result['statuses'], {'200': 2})
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean',
+                    'peak_memory_kb'):
+            self.assertIn(key, result)
+        self.assertFalse(get_user_model().objects.exists())
+
+    @override_settings(DATABASE_REPLICAS=['missing_replica'])
+    def test_reads_stay_on_primary_with_replicas(self):
+        """Test configured replicas are not used for the benchmark."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            # Routing a read to the missing alias would raise
+            call_command(
+                'benchmark_api', users=1, recipes=2, requests=1, warmup=0,
+                only=['recipe:recipe-list'], output=output,
+                stdout=StringIO(), stderr=StringIO())
+
+            with open(output) as file:
+                results = json.load(file)
+
+        self.assertEqual(
+            results['endpoints']['recipe:recipe-list']['statuses'],
+            {'200': 1})
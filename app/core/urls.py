@@ -0,0 +1,17 @@
+"""
+URL mappings for the background job API.
+"""
+from django.urls import path, include
+
+from rest_framework.routers import DefaultRouter
+
+from core import views
+
+router = DefaultRouter()
+router.register('jobs', views.JobViewSet)
+
+app_name = 'job'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
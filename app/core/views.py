@@ -0,0 +1,93 @@
+"""
+Views for service health and background jobs.
+"""
+import logging
+
+from django.db import connections, DatabaseError
+
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema, extend_schema_view, OpenApiParameter)
+
+from core.authentication import CachedTokenAuthentication
+from core.db.pool import pool_stats
+from core.models import Job
+from core.serializers import JobSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class HealthView(APIView):
+    """Report database reachability and connection pool metrics."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT,
+                              503: OpenApiTypes.OBJECT})
+    def get(self, request):
+        """Run SELECT 1 on every database and return the pool metrics."""
+        databases = {}
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                databases[alias] = 'ok'
+            except DatabaseError:
+                # The endpoint is public, so errors are only logged
+                logger.exception('Health check failed for database %s',
+                                 alias)
+                databases[alias] = 'unavailable'
+
+        healthy = all(state == 'ok' for state in databases.values())
+        return Response(
+            {'databases': databases, 'pools': pool_stats()},
+            status=status.HTTP_200_OK if healthy
+            else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class JobCursorPagination(CursorPagination):
+    """Keyset pagination for jobs ordered by newest first."""
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'status', OpenApiTypes.STR,
+                enum=[choice for choice, _ in Job.STATUS_CHOICES],
+                description='Filter by job status.'),
+        ]
+    )
+)
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """View the status of the user's background jobs."""
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = JobCursorPagination
+
+    def get_queryset(self):
+        """Retrieve jobs for authenticated user."""
+        queryset = self.queryset.filter(user=self.request.user)
+
+        value = self.request.query_params.get('status')
+        if value:
+            if value not in dict(Job.STATUS_CHOICES):
+                raise ValidationError({'status': [
+                    f'Choose one of: {", ".join(dict(Job.STATUS_CHOICES))}.'
+                ]})
+            queryset = queryset.filter(status=value)
+
+        return queryset.order_by('-id')
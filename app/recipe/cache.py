@@ -0,0 +1,171 @@
+"""
+Per-user versioned response cache for the Recipe APIs.
+
+Every cached response is keyed on the owner's data version. Writes bump
+the version, which orphans all of that user's cached responses at once;
+orphaned entries simply expire.
+
+Versions live in the shared cache named by RESPONSE_CACHE_ALIAS. Without
+one, they are kept in the DataVersion table, where every process sees
+them, and responses are not cached.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+
+from rest_framework.response import Response
+
+from core.models import DataVersion
+
+
+def _cache():
+    """Return the shared cache for responses and versions, or None."""
+    alias = settings.RESPONSE_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _version_key(user_id):
+    """Return the cache key holding a user's data version."""
+    return f'data-version:{user_id}'
+
+
+def _modified_key(user_id):
+    """Return the cache key holding when a user's data last changed."""
+    return f'data-modified:{user_id}'
+
+
+def _new_version():
+    """Return a version that cannot collide with an evicted one."""
+    return time.time_ns()
+
+
+def _stored_state(user_id):
+    """Return a user's version and last change from the DataVersion table.
+
+    Users whose data was never written since have version 0 and no
+    known last change.
+    """
+    row = DataVersion.objects.filter(user_id=user_id).values_list(
+        'version', 'modified').first()
+    if row is None:
+        return 0, None
+    return row[0], row[1].timestamp()
+
+
+def _bump_stored_version(user_id):
+    """Increment a user's version in the DataVersion table."""
+    table = connection.ops.quote_name(DataVersion._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, version, modified) '
+            f'VALUES (%s, 1, %s) ON CONFLICT (user_id) DO UPDATE SET '
+            f'version = {table}.version + 1, modified = EXCLUDED.modified',
+            [user_id, timezone.now()])
+
+
+def get_data_version(user_id):
+    """Return the current data version for a user."""
+    cache = _cache()
+    if cache is None:
+        return _stored_state(user_id)[0]
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # add() keeps whichever version another process stored first
+        cache.add(_version_key(user_id), _new_version(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def get_data_state(user_id):
+    """Return a user's data version and last change as a Unix time.
+
+    The last change is None when it is not known.
+    """
+    cache = _cache()
+    if cache is None:
+        return _stored_state(user_id)
+    keys = [_version_key(user_id), _modified_key(user_id)]
+    state = cache.get_many(keys)
+    if len(state) < len(keys):
+        # Missing or evicted, so treat the data as changed now
+        cache.add(keys[1], time.time(), timeout=None)
+        cache.add(keys[0], _new_version(), timeout=None)
+        state = cache.get_many(keys)
+    return state.get(keys[0]), state.get(keys[1])
+
+
+def _incr_version(cache, user_id):
+    """Increment a user's data version in the cache."""
+    cache.set(_modified_key(user_id), time.time(), timeout=None)
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # Missing or evicted, so start from a fresh version
+        cache.set(_version_key(user_id), _new_version(), timeout=None)
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached response and validator for a user."""
+    cache = _cache()
+    if cache is None:
+        # Committed with the write itself, so readers see both or neither
+        _bump_stored_version(user_id)
+        return
+    _incr_version(cache, user_id)
+    # Bump again on commit so a reader racing the commit cannot keep
+    # rows it read before the write cached under the new version
+    transaction.on_commit(lambda: _incr_version(cache, user_id))
+
+
+def response_cache_key(request, version):
+    """Return the cache key for a request at a given data version."""
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(params.encode()).hexdigest()
+    # Host is included because paginated responses carry absolute links
+    url = request.get_host() + request.path
+    return f'response:{request.user.pk}:{version}:{url}:{digest}'
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user versioned cache."""
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list or build and cache it."""
+        cache = _cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+        key = response_cache_key(request, get_data_version(request.user.pk))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def perform_destroy(self, instance):
+        """Delete the instance and invalidate the owner's responses."""
+        super().perform_destroy(instance)
+        bump_data_version(instance.user_id)
+
+
+class DataVersionMixin:
+    """Bump the owner's data version after serializer writes."""
+
+    def create(self, validated_data):
+        """Create the instance and invalidate the owner's responses."""
+        instance = super().create(validated_data)
+        bump_data_version(instance.user_id)
+        return instance
+
+    def update(self, instance, validated_data):
+        """Update the instance and invalidate the owner's responses."""
+        instance = super().update(instance, validated_data)
+        bump_data_version(instance.user_id)
+        return instance
@@ -0,0 +1,64 @@
+"""
+Conditional GET support for the Recipe APIs.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from recipe.cache import get_data_state, response_cache_key
+
+
+class ConditionalGetMixin:
+    """Compute validators and answer 304 when the client copy is current.
+
+    Validators come from the owner's data version and last change time,
+    which every write bumps, so unchanged data is never loaded or
+    serialized. A revalidation runs no queries when the versions are in
+    the shared cache, and one primary key lookup otherwise.
+    """
+
+    def get_validators(self):
+        """Return (etag, last_modified) for the current request."""
+        version, last_modified = get_data_state(self.request.user.pk)
+        # Same request at the same data version, same response
+        raw = '{}:{}'.format(
+            response_cache_key(self.request, version),
+            self.request.accepted_media_type)
+        etag = '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+        if last_modified is not None:
+            last_modified = int(last_modified)
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Return a 304 if the client is current, else call handler."""
+        etag, last_modified = self.get_validators()
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """Support If-None-Match and If-Modified-Since on list."""
+
+    def list(self, request, *args, **kwargs):
+        """List rows unless the client copy is current."""
+        return self.conditional_response(request, super().list, *args,
+                                         **kwargs)
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Support If-None-Match and If-Modified-Since on retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a row unless the client copy is current."""
+        return self.conditional_response(request, super().retrieve, *args,
+                                         **kwargs)
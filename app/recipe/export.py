@@ -0,0 +1,67 @@
+"""
+Streaming export of recipes.
+"""
+import csv
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from recipe.serializers import (
+    RecipeDetailSerializer, nested_prefetches)
+
+# Rows fetched from the server side cursor per round trip
+CHUNK_SIZE = 500
+
+CSV_COLUMNS = ['id', 'title', 'description', 'time_minutes',
+               'price', 'link', 'tags', 'ingredients']
+
+
+class Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        """Return the value instead of buffering it."""
+        return value
+
+
+def iter_recipes(queryset, chunk_size=CHUNK_SIZE):
+    """Yield serialized recipes a chunk at a time."""
+    # iterator() streams rows through a server side cursor on Postgres
+    # but ignores prefetch_related, so related rows are loaded per chunk
+    rows = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(
+            chunk, *nested_prefetches('tags', 'ingredients'))
+        # One serializer per chunk, building one per row costs more than
+        # serializing it
+        yield from RecipeDetailSerializer(chunk, many=True).data
+
+
+def iter_ndjson(queryset):
+    """Yield recipes as newline delimited JSON."""
+    encoder = JSONEncoder()
+    for data in iter_recipes(queryset):
+        yield encoder.encode(data) + '\n'
+
+
+def iter_csv(queryset):
+    """Yield recipes as CSV with nested names joined by '|'."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for data in iter_recipes(queryset):
+        # Flatten nested tags and ingredients to their names
+        for key in ('tags', 'ingredients'):
+            data[key] = '|'.join(item['name'] for item in data[key])
+        yield writer.writerow([data[column] for column in CSV_COLUMNS])
+
+
+# Supported formats mapped to (generator, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (iter_csv, 'text/csv', 'csv'),
+}
@@ -0,0 +1,166 @@
+"""
+Background thumbnail generation for recipe images.
+
+Uploads only store the original. Once the upload commits, the resize to
+every size in RECIPE_THUMBNAIL_SIZES runs on the job worker, or a small
+thread pool, and the storage names are written to
+Recipe.image_thumbnails, so request workers never decode or resize
+images.
+"""
+import gc
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from PIL import Image, ImageOps
+
+from core.jobs import enqueue
+from core.models import Recipe
+from recipe.cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = 85
+
+_lock = threading.Lock()
+_executor = None
+
+
+def thumbnail_sizes():
+    """Return {size name: longest edge in pixels}."""
+    return settings.RECIPE_THUMBNAIL_SIZES
+
+
+def _get_executor():
+    """Return the shared thumbnail pool, creating it once."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def shutdown_executor():
+    """Wait for queued thumbnails and stop the pool."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+            # Collect the connection wrappers of the exited threads so
+            # their connections close now
+            gc.collect()
+
+
+def _run_logged(func, *args):
+    """Run func, logging rather than raising its errors."""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('%s%r failed', func.__name__, args)
+
+
+def _run_in_worker(func, *args):
+    """Run func on a pool thread with its own fresh connection."""
+    close_old_connections()
+    try:
+        _run_logged(func, *args)
+    finally:
+        close_old_connections()
+
+
+def _submit(func, *args):
+    """Run func on the pool, or inline when the pool is switched off."""
+    if settings.RECIPE_THUMBNAIL_EXECUTOR == 'inline':
+        _run_logged(func, *args)
+    else:
+        _get_executor().submit(_run_in_worker, func, *args)
+
+
+def thumbnail_name(name, size):
+    """Return the storage name of a rendition of the image name."""
+    base = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join('uploads', 'recipe', 'thumbnails',
+                        f'{base}_{size}.jpg')
+
+
+def render_thumbnails(name):
+    """Resize the stored image name to every size, returning their names."""
+    with default_storage.open(name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image = image.convert('RGB')
+
+    renditions = {}
+    for size, edge in thumbnail_sizes().items():
+        rendition = image.copy()
+        rendition.thumbnail((edge, edge))
+        buffer = io.BytesIO()
+        rendition.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        renditions[size] = default_storage.save(
+            thumbnail_name(name, size), ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def delete_files(names):
+    """Delete stored files, ignoring ones already gone."""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete %s', name, exc_info=True)
+
+
+def generate_thumbnails(recipe_id, user_id, name):
+    """Generate and record the thumbnails of one upload.
+
+    Returns the renditions recorded, or None if the image was replaced or
+    its recipe deleted first.
+    """
+    current = Recipe.objects.filter(pk=recipe_id, image=name)
+    if not current.exists():
+        return None
+
+    renditions = render_thumbnails(name)
+    # Skip recording if the image was replaced while resizing
+    if not current.update(image_thumbnails=renditions,
+                          updated_at=timezone.now()):
+        delete_files(renditions.values())
+        return None
+    bump_data_version(user_id)
+    return renditions
+
+
+def schedule_thumbnails(recipe, old_names=()):
+    """Generate thumbnails for recipe.image once the upload commits.
+
+    old_names are the files of a replaced image, deleted at the same time.
+    """
+    if settings.RECIPE_THUMBNAIL_EXECUTOR == 'queue':
+        # Queued in the upload's transaction, so jobs commit with it
+        if old_names:
+            enqueue('recipe.delete_files', {'names': list(old_names)},
+                    user=recipe.user)
+        if recipe.image:
+            enqueue('recipe.thumbnails', {
+                'recipe_id': recipe.pk, 'user_id': recipe.user_id,
+                'name': recipe.image.name}, user=recipe.user)
+        return
+
+    def submit():
+        if old_names:
+            _submit(delete_files, list(old_names))
+        if recipe.image:
+            _submit(generate_thumbnails, recipe.pk, recipe.user_id,
+                    recipe.image.name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,105 @@
+"""
+Django command to benchmark the recipe list serializers.
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import (Recipe, Tag, Ingredient)
+from recipe.serializers import (
+    RecipeSerializer, RecipeFastListSerializer, nested_prefetches,
+    recipe_columns)
+
+TAGS_PER_RECIPE = 3
+INGREDIENTS_PER_RECIPE = 5
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer with the fast list path.
+
+    Rows are seeded inside a transaction that is rolled back, so the
+    database is left untouched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+',
+                            default=[1000, 10000],
+                            help='Recipe counts to benchmark.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement, the best is kept.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write(
+            f'{"rows":>8} {"serializer s":>14} {"fast path s":>12} '
+            f'{"speedup":>8}')
+        for rows in options['rows']:
+            with transaction.atomic():
+                queryset = self._seed(rows)
+                slow = self._best(options['repeat'], self._render_slow,
+                                  queryset)
+                fast = self._best(options['repeat'], self._render_fast,
+                                  queryset)
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{rows:>8} {slow:>14.3f} {fast:>12.3f} {slow / fast:>7.1f}x')
+
+    def _seed(self, rows):
+        """Create rows recipes with tags and ingredients for a new user."""
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{time.time_ns()}@example.com')
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f'Tag {n}') for n in range(20)])
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(user=user, name=f'Ingredient {n}')
+             for n in range(50)])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Recipe {n}', time_minutes=n % 120,
+                   price=Decimal(n % 10000) / 100,
+                   link=f'http://example.com/{n}')
+            for n in range(rows)
+        ])
+
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(
+                recipe_id=recipe.id, tag_id=tags[(n + i) % len(tags)].id)
+            for n, recipe in enumerate(recipes)
+            for i in range(TAGS_PER_RECIPE)
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredients[(n + i) % len(ingredients)].id)
+            for n, recipe in enumerate(recipes)
+            for i in range(INGREDIENTS_PER_RECIPE)
+        ])
+        return Recipe.objects.filter(user=user).order_by('-id')
+
+    def _best(self, repeat, render, queryset):
+        """Return the fastest of repeat timed renders."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(queryset)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def _render_slow(self, queryset):
+        """Render the list with RecipeSerializer."""
+        queryset = queryset.only(
+            *recipe_columns(RecipeSerializer.Meta.fields)
+        ).prefetch_related(*nested_prefetches('tags', 'ingredients'))
+        return JSONRenderer().render(
+            RecipeSerializer(queryset, many=True).data)
+
+    def _render_fast(self, queryset):
+        """Render the list with RecipeFastListSerializer."""
+        queryset = queryset.values(
+            *recipe_columns(RecipeSerializer.Meta.fields))
+        return JSONRenderer().render(
+            RecipeFastListSerializer(queryset, many=True).data)
@@ -0,0 +1,109 @@
+"""
+Pagination classes for the Recipe APIs.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def _value(item, name):
+    """Return a field of a model instance or values() row."""
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes ordered by newest first.
+
+    Search results are ordered by rank, newest first within a rank. DRF
+    cursors only hold the first ordering field, so ranked pages use a
+    cursor holding both the rank and the id instead.
+    """
+    # The primary key is unique, so the cursor is a plain position
+    # and each page is a single indexed range scan with no OFFSET or COUNT
+    ordering = '-id'
+    page_size = 50
+    # Allow clients to pick a smaller or larger page within limits
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a page, keyed on (rank, id) for search results."""
+        self.ranked = 'rank' in queryset.query.annotations
+        if not self.ranked:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        position = self._decode_position()
+        if position is not None:
+            rank, pk = position
+            # Rows after the position in the direction of travel
+            if reverse:
+                queryset = queryset.filter(
+                    Q(rank__gt=rank) | Q(rank=rank, id__gt=pk))
+            else:
+                queryset = queryset.filter(
+                    Q(rank__lt=rank) | Q(rank=rank, id__lt=pk))
+        ordering = ('rank', 'id') if reverse else ('-rank', '-id')
+
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _decode_position(self):
+        """Return the (rank, id) in a ranked cursor, or None."""
+        if self.cursor is None or self.cursor.position is None:
+            return None
+        try:
+            rank, pk = self.cursor.position.split(':')
+            return Decimal(rank), int(pk)
+        except (InvalidOperation, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _ranked_link(self, item, reverse):
+        """Return the link to the page after item, or before if reverse."""
+        position = '{}:{}'.format(_value(item, 'rank'), _value(item, 'id'))
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=reverse, position=position))
+
+    def get_next_link(self):
+        """Return the next page link."""
+        if not self.ranked:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self._ranked_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        """Return the previous page link."""
+        if not self.ranked:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self._ranked_link(self.page[0], reverse=True)
+
+
+class NameCursorPagination(CursorPagination):
+    """Keyset pagination for tags and ingredients in reverse name order."""
+    # Names are unique per user, so they position the cursor on their own
+    # and each page is a range scan of the (user, name) unique index
+    ordering = '-name'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,43 @@
+"""
+Full text search for recipes.
+"""
+from functools import lru_cache
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity)
+from django.db import connections
+from django.db.models import DecimalField, F
+from django.db.models.functions import Cast
+
+# Text search configuration used by the search_vector trigger
+SEARCH_CONFIG = 'english'
+
+# Ranks are floats, which tie and do not survive a round trip through a
+# cursor. Rounded to a fixed precision numeric they compare exactly
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+@lru_cache(maxsize=None)
+def trigram_available(alias='default'):
+    """Return True if pg_trgm is installed in the database."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_recipes(queryset, term):
+    """Return recipes matching term annotated with a rank.
+
+    Matches come from the GIN indexed search_vector ranked by ts_rank.
+    When nothing matches and pg_trgm is available, titles similar to the
+    term are returned instead so that typos still find results.
+    """
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    matches = queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), RANK_FIELD))
+    if not trigram_available(queryset.db) or matches.exists():
+        return matches
+
+    # The % operator is served by the trigram index on title
+    return queryset.filter(title__trigram_similar=term).annotate(
+        rank=Cast(TrigramSimilarity('title', term), RANK_FIELD))
@@ -2,13 +2,74 @@
     Serializers for Recipe API
 """
 
-from core.models import Tag
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+
 from rest_framework import serializers
 
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+
 from core.models import (Recipe, Tag, Ingredient)
+from recipe.cache import (DataVersionMixin, bump_data_version)
+from recipe.images import schedule_thumbnails
+
+# Rendition shown by the recipe list
+LIST_THUMBNAIL_SIZE = 'small'
+
+# Rendered fields computed from a differently named column
+FIELD_COLUMNS = {
+    'thumbnail': 'image_thumbnails',
+    'thumbnails': 'image_thumbnails',
+}
+
+
+def recipe_columns(fields):
+    """Return the Recipe columns needed to render the non-nested fields."""
+    return list(dict.fromkeys(
+        FIELD_COLUMNS.get(name, name) for name in fields
+        if name not in ('tags', 'ingredients')))
+
+
+def media_url(name, request=None):
+    """Return the URL of a stored file, absolute when given a request."""
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+def list_thumbnail_url(thumbnails, request=None):
+    """Return the list rendition URL, None until it has been generated."""
+    name = (thumbnails or {}).get(LIST_THUMBNAIL_SIZE)
+    return media_url(name, request) if name else None
+
+
+class UniqueNameMixin:
+    """Reject a name the user already has when saving a row directly."""
+
+    def validate_name(self, value):
+        """Check the name is unique for the user."""
+        # Nested under a recipe, existing names are reused instead
+        if self.parent is not None:
+            return value
+
+        model = self.Meta.model
+        queryset = model.objects.filter(
+            user=self.context['request'].user, name=value)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f'A {model._meta.verbose_name} with this name already exists.')
+        return value
+
+
+class IngredientSerializer(UniqueNameMixin, DataVersionMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -17,52 +78,149 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class IngredientListSerializer(IngredientSerializer):
+    """Serializer for the ingredient endpoints, with recipe counts."""
+    # Annotated by the ingredient endpoints' queryset
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagSerializer(UniqueNameMixin, DataVersionMixin,
+                    serializers.ModelSerializer):
     """Serializer for tags."""
+
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
+class TagListSerializer(TagSerializer):
+    """Serializer for the tag endpoints, with recipe counts."""
+    # Annotated by the tag endpoints' queryset
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+def _link_attrs(model, user, field_name, recipe_items):
+    """Get or create named attrs and link them to recipes in bulk.
+
+    recipe_items is a list of (recipe, items) pairs. However many recipes
+    and items are given, this costs one lookup, one insert of the missing
+    names and one insert into the M2M through table.
+    """
+    # Unique names per recipe in the order they were given
+    recipe_names = [
+        (recipe, list(dict.fromkeys(item['name'] for item in items)))
+        for recipe, items in recipe_items
+    ]
+    names = list(dict.fromkeys(
+        name for _, rnames in recipe_names for name in rnames))
+    if not names:
+        return
+
+    # One query for the names that already exist for this user
+    existing = {
+        obj.name: obj for obj in model.objects.filter(
+            user=user, name__in=names)
+    }
+    # One bulk insert for the missing ones. Rows created concurrently by
+    # another request are skipped by the unique constraint and picked up
+    # by re-reading the missing names
+    missing = [name for name in names if name not in existing]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True)
+        existing.update(
+            (obj.name, obj) for obj in model.objects.filter(
+                user=user, name__in=missing))
+
+    # One bulk insert into the M2M through table
+    through = getattr(Recipe, field_name).through
+    attr_column = f'{model._meta.model_name}_id'
+    through.objects.bulk_create([
+        through(**{'recipe_id': recipe.id, attr_column: existing[name].id})
+        for recipe, rnames in recipe_names
+        for name in rnames
+    ], ignore_conflicts=True)
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for creating many recipes with bulk inserts."""
+
+    def create(self, validated_data):
+        """Create recipes and their tags and ingredients in bulk."""
+        auth_user = self.context['request'].user
+        # Split nested items from the recipe fields
+        tags = [data.pop('tags', []) for data in validated_data]
+        ingredients = [data.pop('ingredients', []) for data in validated_data]
+
+        # Postgres returns primary keys from bulk inserts
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**data) for data in validated_data])
+
+        _link_attrs(Tag, auth_user, 'tags', list(zip(recipes, tags)))
+        _link_attrs(Ingredient, auth_user, 'ingredients',
+                    list(zip(recipes, ingredients)))
+
+        bump_data_version(auth_user.pk)
+        return recipes
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for recipes."""
+    """Serializer for recipes.
+
+    Pass fields to render only a subset of the declared fields.
+    """
     # many means a list. Required means nullable
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    # Small rendition only, the original is never sent in lists
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes',
-                  'price', 'link', 'tags', 'ingredients']
+                  'price', 'link', 'tags', 'ingredients', 'thumbnail']
         read_only_fields = ['id']
+        # Used when the serializer is created with many=True
+        list_serializer_class = RecipeListSerializer
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            # Drop every field that was not asked for
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_thumbnail(self, recipe):
+        """Return the URL of the list rendition of the recipe image."""
+        return list_thumbnail_url(
+            recipe.image_thumbnails, self.context.get('request'))
 
     # Private methods _
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
+    def _get_or_create_attrs(self, model, items, recipe, field_name):
+        """Resolve named items as a set and link them to the recipe."""
         # Grab the authenticated user from context
         # Note: Passed by view when using as serializer class
         # through self.context.request property
         auth_user = self.context['request'].user
-        # Iterate through extracted tags list
-        for tag in tags:
-            # If doesn't exist, create, else return existing
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            # add to recipe's tag property
-            recipe.tags.add(tag_obj)
+        _link_attrs(model, auth_user, field_name, [(recipe, items)])
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Handle getting or creating tags as needed."""
+        self._get_or_create_attrs(Tag, tags, recipe, 'tags')
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        # Store user from the context
-        auth_user = self.context['request'].user
-        # Iterate through ingredients
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient)
-            recipe.ingredients.add(ingredient_obj)
+        self._get_or_create_attrs(Ingredient, ingredients, recipe,
+                                  'ingredients')
 
     def create(self, validated_data):
         """Create a recipe."""
@@ -77,6 +235,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
 
+        bump_data_version(recipe.user_id)
         return recipe
 
     # with update you have the instance as well
@@ -104,6 +263,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         # Save all changes
         instance.save()
+        bump_data_version(instance.user_id)
         return instance
 
 
@@ -112,6 +272,113 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail"""
+    # Every rendition by size name
+    thumbnails = serializers.SerializerMethodField()
+
     class Meta(RecipeSerializer.Meta):
-        # Add fields from above but add description
-        fields = RecipeSerializer.Meta.fields + ['description']
+        # Add fields from above but add description and images
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'thumbnails']
+        # Images are only written through the upload endpoint
+        read_only_fields = ['id', 'image']
+
+    @extend_schema_field(serializers.DictField(child=serializers.URLField()))
+    def get_thumbnails(self, recipe):
+        """Return {size name: URL} for the generated renditions."""
+        request = self.context.get('request')
+        return {size: media_url(name, request)
+                for size, name in recipe.image_thumbnails.items()}
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Serializer for uploading images to recipes."""
+
+    class Meta:
+        model = Recipe
+        fields = ['id', 'image']
+        read_only_fields = ['id']
+        extra_kwargs = {'image': {'required': True}}
+
+    def update(self, instance, validated_data):
+        """Store the original and queue its thumbnails."""
+        # Files of the replaced image, removed once the upload commits
+        old_names = list(instance.image_thumbnails.values())
+        if instance.image:
+            old_names.append(instance.image.name)
+
+        # Renditions of the old image must not outlive it
+        instance.image_thumbnails = {}
+        instance = super().update(instance, validated_data)
+        schedule_thumbnails(instance, old_names)
+        bump_data_version(instance.user_id)
+        return instance
+
+
+def nested_prefetches(*field_names):
+    """Return prefetches for nested relations in a stable id order."""
+    return [
+        Prefetch(name, queryset=Recipe._meta.get_field(
+            name).related_model.objects.order_by('id'))
+        for name in field_names
+    ]
+
+
+class RecipeFastListSerializer:
+    """Read only fast path for RecipeSerializer(many=True).
+
+    Works on dicts from a values() queryset and loads nested relations
+    with one values query per relation, skipping per field serializer
+    work. The rendered output is identical to RecipeSerializer.
+    """
+    # Same exponent DecimalField quantizes the price to
+    price_exponent = Decimal(10) ** -Recipe._meta.get_field(
+        'price').decimal_places
+
+    def __init__(self, instance, many=True, fields=None, context=None,
+                 **kwargs):
+        self.instance = instance
+        self.fields = fields or RecipeSerializer.Meta.fields
+        self.request = (context or {}).get('request')
+
+    @property
+    def data(self):
+        """Return the rendered list of recipes."""
+        rows = list(self.instance)
+        ids = [row['id'] for row in rows]
+        nested = {
+            name: self._group_nested(name, ids)
+            for name in ('tags', 'ingredients') if name in self.fields
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name in nested:
+                    item[name] = nested[name].get(row['id'], [])
+                elif name == 'price':
+                    # Matches DecimalField with COERCE_DECIMAL_TO_STRING
+                    item[name] = '{:f}'.format(
+                        row[name].quantize(self.price_exponent))
+                elif name == 'thumbnail':
+                    item[name] = list_thumbnail_url(
+                        row['image_thumbnails'], self.request)
+                else:
+                    item[name] = row[name]
+            data.append(item)
+        return data
+
+    @staticmethod
+    def _group_nested(field_name, ids):
+        """Return {recipe id: [{'id', 'name'}, ...]} for a relation."""
+        field = Recipe._meta.get_field(field_name)
+        target = field.m2m_reverse_field_name()
+        rows = field.remote_field.through.objects.filter(
+            recipe_id__in=ids
+        ).order_by(f'{target}_id').values_list(
+            'recipe_id', f'{target}_id', f'{target}__name')
+
+        grouped = defaultdict(list)
+        for recipe_id, attr_id, name in rows:
+            grouped[recipe_id].append({'id': attr_id, 'name': name})
+        return grouped
@@ -0,0 +1,19 @@
+"""
+Background jobs for the Recipe APIs.
+"""
+from core.jobs import task
+from recipe import images
+
+
+@task('recipe.thumbnails')
+def generate_thumbnails(job):
+    """Resize an uploaded recipe image, returning the renditions."""
+    payload = job.payload
+    return images.generate_thumbnails(
+        payload['recipe_id'], payload['user_id'], payload['name'])
+
+
+@task('recipe.delete_files')
+def delete_files(job):
+    """Delete the files of a replaced recipe image."""
+    images.delete_files(job.payload['names'])
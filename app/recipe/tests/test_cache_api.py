@@ -0,0 +1,170 @@
+"""Tests for the per-user versioned response cache."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (DataVersion, Recipe, Tag)
+
+from recipe.cache import (bump_data_version, get_data_version)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'response-cache-tests',
+    },
+}
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def data_queries(queries):
+    """Return captured queries that load recipe or tag rows."""
+    return [q for q in queries
+            if 'SELECT "core_' in q['sql'] and 'COUNT(' not in q['sql']]
+
+
+@override_settings(CACHES=SHARED_CACHES, RESPONSE_CACHE_ALIAS='shared')
+class ResponseCacheTests(TestCase):
+    """Test list responses are cached per user and data version."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not reload rows."""
+        create_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(data_queries(ctx.captured_queries), [])
+
+    def test_query_params_cached_separately(self):
+        """Test different query params do not share a cache entry."""
+        create_recipe(self.user)
+        create_recipe(self.user)
+
+        full = self.client.get(RECIPES_URL)
+        page = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertEqual(len(full.data['results']), 2)
+        self.assertEqual(len(page.data['results']), 1)
+
+    def test_create_invalidates(self):
+        """Test creating a recipe through the API invalidates the list."""
+        self.client.get(RECIPES_URL)
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload, format='json')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tag_update_invalidates_recipe_list(self):
+        """Test renaming a tag invalidates the user's recipe list."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Vegetarian'})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'],
+                         'Vegetarian')
+
+    def test_destroy_invalidates(self):
+        """Test deleting a tag invalidates the tag list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.assertEqual(len(self.client.get(TAGS_URL).data['results']), 1)
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_bump_only_affects_owner(self):
+        """Test bumping one user's version leaves others alone."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        own_version = get_data_version(self.user.pk)
+        other_version = get_data_version(other.pk)
+
+        bump_data_version(self.user.pk)
+
+        self.assertNotEqual(get_data_version(self.user.pk), own_version)
+        self.assertEqual(get_data_version(other.pk), other_version)
+
+    def test_evicted_version_not_reused(self):
+        """Test a lost version key never resurrects old responses."""
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+        version = get_data_version(self.user.pk)
+
+        caches['shared'].delete(f'data-version:{self.user.pk}')
+
+        self.assertNotEqual(get_data_version(self.user.pk), version)
+
+
+class NoResponseCacheTests(TestCase):
+    """Test lists without a shared cache for responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_cached(self):
+        """Test every list request loads the rows."""
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertTrue(data_queries(ctx.captured_queries))
+
+    def test_bump_stored_in_database(self):
+        """Test versions are kept where every process sees them."""
+        version = get_data_version(self.user.pk)
+
+        bump_data_version(self.user.pk)
+
+        self.assertEqual(get_data_version(self.user.pk), version + 1)
+        self.assertEqual(
+            DataVersion.objects.get(user_id=self.user.pk).version,
+            version + 1)
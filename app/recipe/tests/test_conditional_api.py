@@ -0,0 +1,247 @@
+"""Tests for conditional GET on the recipe APIs."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+from recipe.cache import bump_data_version
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'conditional-tests',
+    },
+}
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling with versions in the database."""
+    # Queries answering a revalidation
+    revalidation_tables = ['core_dataversion']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def _assert_not_modified(self, url):
+        """Fetch url, then check a revalidation returns 304."""
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        return etag
+
+    def test_recipe_list_not_modified(self):
+        """Test recipe list answers 304 for a matching ETag."""
+        create_recipe(self.user)
+
+        self._assert_not_modified(RECIPES_URL)
+
+    def test_recipe_detail_not_modified(self):
+        """Test recipe detail answers 304 for a matching ETag."""
+        recipe = create_recipe(self.user)
+
+        self._assert_not_modified(detail_url(recipe.id))
+
+    def test_not_modified_skips_loading_rows(self):
+        """Test a 304 is answered without loading any rows."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(
+            [query['sql'].split('FROM ')[1].split()[0].strip('"')
+             for query in ctx.captured_queries], self.revalidation_tables)
+
+    def test_write_elsewhere_changes_etag(self):
+        """Test a write recorded by another process changes the ETag."""
+        recipe = create_recipe(self.user)
+        etag = self._assert_not_modified(detail_url(recipe.id))
+
+        # The worker, a shell or another web process saving the recipe
+        Recipe.objects.filter(pk=recipe.pk).update(title='Renamed')
+        bump_data_version(self.user.pk)
+        res = self.client.get(detail_url(recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Renamed')
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since answers 304 when nothing changed."""
+        recipe = create_recipe(self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        res = self.client.get(detail_url(recipe.id),
+                              HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_update_changes_etag(self):
+        """Test updating a recipe invalidates the list ETag."""
+        recipe = create_recipe(self.user)
+        etag = self._assert_not_modified(RECIPES_URL)
+
+        self.client.patch(detail_url(recipe.id), {'title': 'New title'})
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_recipe_delete_changes_etag(self):
+        """Test deleting an older recipe invalidates the list ETag."""
+        older = create_recipe(self.user)
+        create_recipe(self.user)
+        etag = self._assert_not_modified(RECIPES_URL)
+
+        self.client.delete(detail_url(older.id))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_m2m_change_touches_recipe(self):
+        """Test adding and removing tags bumps the recipe updated_at."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        before = recipe.updated_at
+
+        recipe.tags.add(tag)
+        recipe.refresh_from_db()
+        added = recipe.updated_at
+        tag.recipe_set.remove(recipe)
+        recipe.refresh_from_db()
+
+        self.assertGreater(added, before)
+        self.assertGreater(recipe.updated_at, added)
+
+    def test_ingredient_rename_touches_recipe(self):
+        """Test renaming an ingredient bumps recipes that use it."""
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        recipe.refresh_from_db()
+        before = recipe.updated_at
+
+        ingredient.name = 'Sea salt'
+        ingredient.save()
+        recipe.refresh_from_db()
+
+        self.assertGreater(recipe.updated_at, before)
+
+    def test_tag_and_ingredient_lists_not_modified(self):
+        """Test tag and ingredient lists answer 304 for a matching ETag."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        self._assert_not_modified(TAGS_URL)
+        self._assert_not_modified(INGREDIENTS_URL)
+
+    def test_tag_list_modified_by_recipe_links(self):
+        """Test linking a tag to a new recipe changes the tag list ETag."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        # Bulk creation links tags without m2m signals
+        self.client.post(reverse('recipe:recipe-bulk-create'), [{
+            'title': 'Salad', 'time_minutes': 5, 'price': '2.00',
+            'tags': [{'name': tag.name}]}], format='json')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['recipe_count'], 1)
+
+    def test_ingredient_rename_changes_etag(self):
+        """Test renaming an ingredient outside the API changes the ETag."""
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        etag = self._assert_not_modified(detail_url(recipe.id))
+
+        ingredient.name = 'Sea salt'
+        ingredient.save()
+        res = self.client.get(detail_url(recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_validators_run_no_queries(self):
+        """Test a full list response adds no validator queries."""
+        create_recipe(self.user)
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(TAGS_URL, {'page_size': 1})
+
+        sql = ' '.join(q['sql'].upper() for q in ctx.captured_queries)
+        # The old validators aggregated every recipe of the user
+        self.assertNotIn('MAX(', sql)
+
+    def test_etag_differs_between_users(self):
+        """Test another user's ETag is not honoured."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        create_recipe(other)
+        create_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_new_user_has_last_modified(self):
+        """Test a new user's lists carry Last-Modified."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('Last-Modified', res)
+
+
+@override_settings(CACHES=SHARED_CACHES, RESPONSE_CACHE_ALIAS='shared')
+class SharedCacheConditionalGetTests(ConditionalGetTests):
+    """Test ETag and Last-Modified handling with versions in the cache."""
+    revalidation_tables = []
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(caches['shared'].clear)
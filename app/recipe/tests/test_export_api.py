@@ -0,0 +1,139 @@
+"""Tests for the recipe export API."""
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+
+from recipe import export
+from recipe.serializers import RecipeDetailSerializer
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicExportApiTests(TestCase):
+    """Test unauthenticated export requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to export recipes."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test authenticated export requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as NDJSON with nested relations."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'))
+        create_recipe(self.user, title='Second')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        expected = RecipeDetailSerializer(recipes, many=True).data
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with nested names joined."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Quick'))
+
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], recipe.title)
+        self.assertEqual(rows[0]['price'], '5.25')
+        self.assertEqual(set(rows[0]['tags'].split('|')), {'Dinner', 'Quick'})
+
+    def test_export_limited_to_user(self):
+        """Test export only contains the authenticated user's recipes."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        create_recipe(other)
+        recipe = create_recipe(self.user)
+
+        res = self.client.get(EXPORT_URL)
+
+        content = b''.join(res.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [recipe.id])
+
+    def test_export_in_chunks(self):
+        """Test recipes spanning several chunks are all exported."""
+        for index in range(5):
+            create_recipe(self.user, title=f'Recipe {index}')
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+
+        rows = list(export.iter_recipes(queryset, chunk_size=2))
+
+        self.assertEqual([row['id'] for row in rows],
+                         list(queryset.values_list('id', flat=True)))
+
+    def _export_queries(self):
+        """Return the number of queries used to stream the export."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(EXPORT_URL)
+            b''.join(res.streaming_content)
+        return len(ctx.captured_queries)
+
+    def test_export_query_count_constant(self):
+        """Test exporting does not load columns or relations per row."""
+        create_recipe(self.user)
+        baseline = self._export_queries()
+
+        for index in range(10):
+            create_recipe(self.user, title=f'Recipe {index}')
+
+        self.assertEqual(self._export_queries(), baseline)
+
+    def test_export_invalid_format(self):
+        """Test an unknown export format returns an error."""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,67 @@
+"""Tests for the fast path recipe list serializer."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+
+from recipe.serializers import (
+    RecipeSerializer, RecipeFastListSerializer, nested_prefetches,
+    recipe_columns)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FastListSerializerTests(TestCase):
+    """Test the fast path renders exactly like RecipeSerializer."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        prices = [Decimal('5.25'), Decimal('10'), Decimal('0.5')]
+        for index, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}', time_minutes=index,
+                price=price, link=f'http://example.com/{index}')
+            for n in range(index):
+                tag, _ = Tag.objects.get_or_create(
+                    user=self.user, name=f'Tag {n}')
+                recipe.tags.add(tag)
+            if index:
+                recipe.ingredients.add(Ingredient.objects.create(
+                    user=self.user, name=f'Ingredient {index}'))
+
+    def test_output_identical(self):
+        """Test fast path bytes match the model serializer's bytes."""
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        fields = RecipeSerializer.Meta.fields
+        expected = RecipeSerializer(
+            queryset.prefetch_related(
+                *nested_prefetches('tags', 'ingredients')),
+            many=True).data
+
+        fast = RecipeFastListSerializer(
+            queryset.values(*recipe_columns(fields)), many=True).data
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(expected))
+
+    def test_api_output_identical(self):
+        """Test the list endpoint renders the same with either path."""
+        for params in ({}, {'fields': 'id,price', 'expand': 'tags'}):
+            fast = self.client.get(RECIPES_URL, params)
+            with override_settings(RECIPE_FAST_LIST=False):
+                cache.clear()
+                slow = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(fast.content, slow.content)
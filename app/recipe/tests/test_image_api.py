@@ -0,0 +1,221 @@
+"""Tests for recipe image uploads and thumbnails."""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Recipe
+
+from recipe.images import shutdown_executor
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload_url(recipe_id):
+    """Create and return an image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def upload_file(size=(1600, 1200)):
+    """Return a temporary JPEG file of the given size."""
+    image_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+    Image.new('RGB', size, color='red').save(image_file, format='JPEG')
+    image_file.seek(0)
+    return image_file
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    RECIPE_THUMBNAIL_EXECUTOR='inline',
+    RECIPE_THUMBNAIL_SIZES={'small': 64, 'large': 256},
+)
+class ImageUploadTests(TestCase):
+    """Tests for the image upload API."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=5,
+            price=Decimal('5.50'))
+
+    def _upload(self, size=(1600, 1200)):
+        """Upload an image to the recipe and return the response."""
+        with upload_file(size) as image_file:
+            # Thumbnails are generated when the upload commits
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    image_upload_url(self.recipe.id), {'image': image_file},
+                    format='multipart')
+
+    def test_upload_image(self):
+        """Test uploading an image stores the original."""
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('image', res.data)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_generates_thumbnails(self):
+        """Test every configured rendition is generated and bounded."""
+        self._upload()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_thumbnails), {'small', 'large'})
+        small = os.path.join(MEDIA_ROOT, self.recipe.image_thumbnails['small'])
+        with Image.open(small) as image:
+            self.assertEqual(image.size, (64, 48))
+
+    def test_list_returns_small_rendition_only(self):
+        """Test the list links the small rendition, never the original."""
+        self._upload()
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(RECIPES_URL)
+
+        item = res.data['results'][0]
+        self.assertTrue(item['thumbnail'].endswith(
+            self.recipe.image_thumbnails['small']))
+        self.assertTrue(item['thumbnail'].startswith('http://'))
+        self.assertNotIn('image', item)
+        self.assertNotIn(self.recipe.image.name, str(res.data))
+
+    def test_fast_and_model_lists_identical(self):
+        """Test both list paths render thumbnails the same way."""
+        self._upload()
+        responses = []
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(RECIPE_FAST_LIST=fast):
+                responses.append(self.client.get(RECIPES_URL).content)
+
+        self.assertEqual(responses[0], responses[1])
+
+    def test_detail_returns_all_renditions(self):
+        """Test the detail returns the original and every rendition."""
+        self._upload()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(res.data['image'])
+        self.assertEqual(set(res.data['thumbnails']), {'small', 'large'})
+
+    def test_thumbnail_none_before_upload(self):
+        """Test recipes without an image list no thumbnail."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIsNone(res.data['results'][0]['thumbnail'])
+
+    def test_replacing_image_removes_old_files(self):
+        """Test replacing an image deletes the old original and renditions."""
+        self._upload()
+        self.recipe.refresh_from_db()
+        old = [self.recipe.image.path] + [
+            os.path.join(MEDIA_ROOT, name)
+            for name in self.recipe.image_thumbnails.values()]
+
+        self._upload(size=(300, 300))
+
+        self.recipe.refresh_from_db()
+        for path in old:
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(set(self.recipe.image_thumbnails), {'small', 'large'})
+
+    @override_settings(RECIPE_THUMBNAIL_EXECUTOR='queue')
+    def test_upload_queues_thumbnail_job(self):
+        """Test the queue executor resizes in a job run by the worker."""
+        self._upload()
+
+        job = Job.objects.get(name='recipe.thumbnails')
+        self.assertEqual(job.user, self.user)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_thumbnails, {})
+
+        jobs.run(jobs.claim('test-worker')[0])
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, self.recipe.image_thumbnails)
+        self.assertEqual(set(self.recipe.image_thumbnails), {'small', 'large'})
+
+    def test_upload_image_bad_request(self):
+        """Test uploading an invalid image."""
+        res = self.client.post(
+            image_upload_url(self.recipe.id), {'image': 'notanimage'},
+            format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_keeps_thumbnails(self):
+        """Test updating a recipe does not touch its image columns."""
+        self._upload()
+        self.recipe.refresh_from_db()
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'New'})
+
+        thumbnails = self.recipe.image_thumbnails
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_thumbnails, thumbnails)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    RECIPE_THUMBNAIL_EXECUTOR='thread',
+    RECIPE_THUMBNAIL_SIZES={'small': 64},
+)
+class BackgroundThumbnailTests(TransactionTestCase):
+    """Test thumbnails are generated on the worker pool."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=5,
+            price=Decimal('5.50'))
+        # Workers hold connections that must go before the tables flush
+        self.addCleanup(shutdown_executor)
+
+    def test_thumbnails_generated_off_request_thread(self):
+        """Test the upload returns and the pool records the thumbnails."""
+        with upload_file() as image_file:
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': image_file},
+                format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # Wait for the queued resize to finish
+        shutdown_executor()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_thumbnails), {'small'})
@@ -1,13 +1,16 @@
 """Tests for Ingredients API."""
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
-from recipe.serializers import IngredientSerializer
+from core.models import (Ingredient, Recipe)
+from recipe.serializers import IngredientListSerializer
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
 
@@ -57,12 +60,13 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
         # Query db for data and order by name
-        ingredients = Ingredient.objects.all().order_by('-name')
+        ingredients = Ingredient.objects.annotate(
+            recipe_count=Count('recipe')).order_by('-name')
         # Serialize to simulate API
-        serialized = IngredientSerializer(ingredients, many=True)
+        serialized = IngredientListSerializer(ingredients, many=True)
 
         self.assertEqual(ingredients.count(), 2)
-        self.assertEqual(res.data, serialized.data)
+        self.assertEqual(res.data['results'], serialized.data)
 
     def test_ingredients_limited_to_user(self):
         """Tests list of ingredients is limited to authenticated user"""
@@ -80,12 +84,13 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
         # Query db
-        ingredients = Ingredient.objects.filter(user=self.user)
+        ingredients = Ingredient.objects.filter(user=self.user).annotate(
+            recipe_count=Count('recipe'))
         # serialize data
-        serialized = IngredientSerializer(ingredients, many=True)
+        serialized = IngredientListSerializer(ingredients, many=True)
         # Assert received same as db
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serialized.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serialized.data)
 
     def test_update_ingredient(self):
         """Test updating an ingredient."""
@@ -120,5 +125,23 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
 
         # Assert that no ingredient exists
-        ingredients = Ingredient.objects.filter(user=self.user)
+        ingredients = Ingredient.objects.filter(user=self.user).annotate(
+            recipe_count=Count('recipe'))
         self.assertFalse(ingredients.exists())
+
+    def test_filter_assigned_only_with_counts(self):
+        """Test assigned_only lists used ingredients with their counts."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Unused')
+        for _ in range(2):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Sample', time_minutes=5,
+                price=Decimal('5.00'))
+            recipe.ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['id'], item['recipe_count'])
+             for item in res.data['results']], [(salt.id, 2)])
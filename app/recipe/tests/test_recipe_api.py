@@ -15,6 +15,7 @@ from recipe.serializers import (
     RecipeSerializer, RecipeDetailSerializer, IngredientSerializer)
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-create')
 
 # Helper functions
 
@@ -91,8 +92,8 @@ class PrivateRecipeAPITest(TestCase):
 
         # Check response status code OK
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        # Check response data is equal to serializer data
-        self.assertEqual(res.data, serializer.data)
+        # Check paginated results are equal to serializer data
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes limited to authenticated user."""
@@ -111,8 +112,30 @@ class PrivateRecipeAPITest(TestCase):
 
         # Check response status code OK
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        # Check response data is equal to serializer data
-        self.assertEqual(res.data, serialized.data)
+        # Check paginated results are equal to serializer data
+        self.assertEqual(res.data['results'], serialized.data)
+
+    def test_recipe_list_paginated_by_cursor(self):
+        """Test recipe list pages are walked with opaque cursors."""
+        # Create more recipes than fit on a single page
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+        # Cursor pagination never counts the table
+        self.assertNotIn('count', res.data)
+
+        # Follow next links until exhausted
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(item['id'] for item in res.data['results'])
+
+        # Every recipe seen once, newest first
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -129,6 +152,19 @@ class PrivateRecipeAPITest(TestCase):
         # Check response data is equal to serializer data
         self.assertEqual(res.data, serialized.data)
 
+    def test_recipe_detail_nests_tags_without_counts(self):
+        """Test nested tags and ingredients only have their id and name."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'))
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['tags'][0]), {'id', 'name'})
+        self.assertEqual(set(res.data['ingredients'][0]), {'id', 'name'})
+
     def test_create_recipe(self):
         """Test creating a recipe."""
         payload = {
@@ -533,3 +569,163 @@ class PrivateRecipeAPITest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         # Assert that there are no ingredients in recipe
         self.assertEqual(recipe.ingredients.count(), 0)
+
+    def test_bulk_create_recipes(self):
+        """Test creating several recipes in a single request."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = [
+            {
+                'title': 'Thai Prawn Curry',
+                'time_minutes': 45,
+                'price': Decimal('10.55'),
+                'description': 'Prawn curry description',
+                'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
+                'ingredients': [{'name': 'Prawns'}],
+            },
+            {
+                'title': 'Pongal',
+                'time_minutes': 60,
+                'price': Decimal('4.50'),
+                'tags': [{'name': 'Dinner'}],
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        # Results are returned per item in request order
+        self.assertEqual([item['title'] for item in res.data],
+                         [item['title'] for item in payload])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 2)
+        curry = recipes.get(id=res.data[0]['id'])
+        self.assertEqual(curry.description, payload[0]['description'])
+        self.assertEqual(curry.ingredients.get().name, 'Prawns')
+        # Existing tag reused rather than duplicated
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Dinner').count(), 1)
+        self.assertEqual(
+            Tag.objects.get(name='Dinner').recipe_set.count(), 2)
+
+    def test_bulk_create_invalid_item_creates_nothing(self):
+        """Test a single invalid item rejects the whole batch."""
+        payload = [
+            {'title': 'Valid', 'time_minutes': 5, 'price': Decimal('1.00')},
+            {'title': 'Missing price', 'time_minutes': 5},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        # Errors are reported against the failing item only
+        self.assertEqual(res.data[0], {})
+        self.assertIn('price', res.data[1])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test bulk create rejects a single object."""
+        payload = {'title': 'Single', 'time_minutes': 5, 'price': '1.00'}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_tags(self):
+        """Test filtering recipes by tags."""
+        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
+        r2 = create_recipe(user=self.user, title='Aubergine with Tahini')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Vegetarian')
+        r1.tags.add(tag1)
+        r2.tags.add(tag2)
+        r3 = create_recipe(user=self.user, title='Fish and chips')
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPES_URL, params)
+
+        s1 = RecipeSerializer(r1)
+        s2 = RecipeSerializer(r2)
+        s3 = RecipeSerializer(r3)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_ingredients(self):
+        """Test filtering recipes by ingredients."""
+        r1 = create_recipe(user=self.user, title='Posh Beans on Toast')
+        r2 = create_recipe(user=self.user, title='Chicken Cacciatore')
+        in1 = Ingredient.objects.create(user=self.user, name='Feta Cheese')
+        in2 = Ingredient.objects.create(user=self.user, name='Chicken')
+        r1.ingredients.add(in1)
+        r2.ingredients.add(in2)
+        r3 = create_recipe(user=self.user, title='Red Lentil Daal')
+
+        params = {'ingredients': f'{in1.id},{in2.id}'}
+        res = self.client.get(RECIPES_URL, params)
+
+        s1 = RecipeSerializer(r1)
+        s2 = RecipeSerializer(r2)
+        s3 = RecipeSerializer(r3)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_tags_and_ingredients(self):
+        """Test both filters must match and results are not duplicated."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        match = create_recipe(user=self.user, title='Match')
+        match.tags.add(tag1, tag2)
+        match.ingredients.add(salt)
+        tag_only = create_recipe(user=self.user, title='Tag only')
+        tag_only.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'ingredients': f'{salt.id}'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [match.id])
+
+    def test_filter_invalid_ids_error(self):
+        """Test non numeric filter ids return an error."""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sparse_fields(self):
+        """Test ?fields limits the rendered recipe fields."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,title,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data['results'][0]),
+                         ['id', 'title', 'price'])
+
+    def test_list_expand_nested(self):
+        """Test ?expand adds only the named nested relation."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id', 'expand': 'tags'})
+
+        self.assertEqual(res.data['results'][0],
+                         {'id': recipe.id, 'tags': [
+                             {'id': recipe.tags.get().id, 'name': 'Vegan'}]})
+
+    def test_expand_without_fields_keeps_scalar_fields(self):
+        """Test ?expand alone renders scalar fields and the relation."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id), {'expand': 'ingredients'})
+
+        self.assertIn('description', res.data)
+        self.assertIn('ingredients', res.data)
+        self.assertNotIn('tags', res.data)
+
+    def test_unknown_field_error(self):
+        """Test requesting an unknown field returns an error."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,229 @@
+"""Query count regression tests for the recipe APIs."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe_with_relations(user, index):
+    """Create and return a recipe with two tags and two ingredients."""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=f'Recipe {index}',
+        time_minutes=10,
+        price=Decimal('5.00'),
+    )
+    # Give each recipe its own related rows so nothing is shared
+    for n in range(2):
+        recipe.tags.add(
+            Tag.objects.create(user=user, name=f'Tag {index}-{n}'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=user, name=f'Ing {index}-{n}'))
+
+    return recipe
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the number of queries issued by the recipe APIs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def _count_queries(self, url):
+        """Return the number of queries used to GET the url."""
+        # Measure the database path rather than the response cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.captured = ctx.captured_queries
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes does not scale queries with row count."""
+        create_recipe_with_relations(self.user, 0)
+        baseline = self._count_queries(RECIPES_URL)
+
+        # Add more recipes and check the count stays the same
+        for index in range(1, 10):
+            create_recipe_with_relations(self.user, index)
+        queries = self._count_queries(RECIPES_URL)
+
+        self.assertEqual(queries, baseline)
+
+    def test_detail_query_count_constant(self):
+        """Test recipe detail does not scale queries with related rows."""
+        recipe = create_recipe_with_relations(self.user, 0)
+        baseline = self._count_queries(detail_url(recipe.id))
+
+        # Attach more tags and ingredients and check the count is unchanged
+        for n in range(2, 10):
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Extra tag {n}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Extra {n}'))
+        queries = self._count_queries(detail_url(recipe.id))
+
+        self.assertEqual(queries, baseline)
+
+    def _create_payload(self, count):
+        """Return a recipe payload with count tags and ingredients."""
+        return {
+            'title': 'Bulk recipe',
+            'time_minutes': 30,
+            'price': Decimal('7.50'),
+            'tags': [{'name': f'Tag {n}'} for n in range(count)],
+            'ingredients': [{'name': f'Ing {n}'} for n in range(count)],
+        }
+
+    def test_create_query_count_constant(self):
+        """Test creating a recipe does not scale queries with nested items."""
+        with CaptureQueriesContext(connection) as small:
+            res = self.client.post(
+                RECIPES_URL, self._create_payload(1), format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                RECIPES_URL, self._create_payload(30), format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(large.captured_queries),
+                         len(small.captured_queries))
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+    def test_update_query_count_constant(self):
+        """Test updating a recipe does not scale queries with nested items."""
+        recipe = create_recipe_with_relations(self.user, 0)
+        url = detail_url(recipe.id)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.patch(url, self._create_payload(1), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.patch(url, self._create_payload(30), format='json')
+
+        self.assertEqual(len(large.captured_queries),
+                         len(small.captured_queries))
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+    def test_create_duplicate_names_resolved_once(self):
+        """Test repeated names in a payload map to a single row."""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        payload = self._create_payload(0)
+        payload['ingredients'] = [
+            {'name': 'Salt'}, {'name': 'Pepper'}, {'name': 'Pepper'}]
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_list_page_does_not_count_or_offset(self):
+        """Test a deep page is fetched without COUNT or OFFSET scans."""
+        for index in range(5):
+            create_recipe_with_relations(self.user, index)
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        res = self.client.get(res.data['next'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sql = ' '.join(q['sql'].upper() for q in ctx.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test bulk creating recipes does not scale queries with items."""
+        bulk_url = reverse('recipe:recipe-bulk-create')
+
+        with CaptureQueriesContext(connection) as small:
+            res = self.client.post(
+                bulk_url, [self._create_payload(2)], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(
+                bulk_url, [self._create_payload(5) for _ in range(20)],
+                format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(large.captured_queries),
+                         len(small.captured_queries))
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 21)
+
+    def test_filtered_list_query_count_constant(self):
+        """Test filtering by tags does not scale queries with row count."""
+        tag = Tag.objects.create(user=self.user, name='Shared')
+        create_recipe_with_relations(self.user, 0).tags.add(tag)
+        url = f'{RECIPES_URL}?tags={tag.id}'
+        baseline = self._count_queries(url)
+
+        for index in range(1, 10):
+            create_recipe_with_relations(self.user, index).tags.add(tag)
+        queries = self._count_queries(url)
+
+        self.assertEqual(queries, baseline)
+        sql = ' '.join(q['sql'].upper() for q in self.captured)
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_sparse_fields_skip_columns_and_prefetch(self):
+        """Test ?fields loads only the needed columns and relations."""
+        create_recipe_with_relations(self.user, 0)
+
+        self._count_queries(f'{RECIPES_URL}?fields=id,title,price')
+
+        sql = ' '.join(q['sql'] for q in self.captured)
+        self.assertNotIn('"core_recipe"."description"', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertNotIn('core_recipe_ingredients', sql)
+
+    def test_list_does_not_load_description(self):
+        """Test the default list skips the description it never renders."""
+        create_recipe_with_relations(self.user, 0)
+
+        self._count_queries(RECIPES_URL)
+
+        sql = ' '.join(q['sql'] for q in self.captured)
+        self.assertNotIn('"core_recipe"."description"', sql)
+
+    def test_tag_list_counts_in_one_query(self):
+        """Test tag recipe counts do not scale queries with row count."""
+        create_recipe_with_relations(self.user, 0)
+        url = f"{reverse('recipe:tag-list')}?assigned_only=1"
+        baseline = self._count_queries(url)
+
+        for index in range(1, 10):
+            create_recipe_with_relations(self.user, index)
+        queries = self._count_queries(url)
+
+        self.assertEqual(queries, baseline)
+        sql = ' '.join(q['sql'].upper() for q in self.captured)
+        self.assertNotIn('GROUP BY', sql)
@@ -0,0 +1,146 @@
+"""Tests for recipe full text search."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.search import trigram_available
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes by title and description."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='pass123abc')
+        self.client.force_authenticate(self.user)
+
+    def _search(self, term, **params):
+        """Return the ids of recipes found for term."""
+        res = self.client.get(RECIPES_URL, {'search': term, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_vector_maintained_on_write(self):
+        """Test the search vector is filled on insert and update."""
+        recipe = create_recipe(self.user, title='Lemon tart')
+        recipe.refresh_from_db()
+        self.assertIn('lemon', recipe.search_vector)
+
+        recipe.title = 'Lime tart'
+        recipe.save()
+        recipe.refresh_from_db()
+
+        self.assertIn('lime', recipe.search_vector)
+        self.assertNotIn('lemon', recipe.search_vector)
+
+    def test_search_matches_stemmed_words(self):
+        """Test search matches title and description word forms."""
+        curry = create_recipe(self.user, title='Thai green curry')
+        soup = create_recipe(self.user, title='Soup',
+                             description='A spicy soup of curried lentils')
+        create_recipe(self.user, title='Fish and chips')
+
+        self.assertEqual(set(self._search('curries')), {curry.id, soup.id})
+
+    def test_title_matches_rank_first(self):
+        """Test title matches outrank description matches."""
+        described = create_recipe(
+            self.user, title='Weeknight dinner',
+            description='Pasta with tomato sauce')
+        titled = create_recipe(self.user, title='Tomato pasta')
+
+        self.assertEqual(self._search('tomato'), [titled.id, described.id])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the user's recipes."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass123abc')
+        create_recipe(other, title='Banana bread')
+        own = create_recipe(self.user, title='Banana bread')
+
+        self.assertEqual(self._search('banana'), [own.id])
+
+    def test_search_paginates_by_rank(self):
+        """Test ranked results are paged without repeats."""
+        ids = {create_recipe(self.user, title=f'Pie number {n}').id
+               for n in range(5)}
+
+        res = self.client.get(RECIPES_URL, {'search': 'pie', 'page_size': 2})
+        found = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            found.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(len(found), 5)
+        self.assertEqual(set(found), ids)
+
+    def test_search_pages_every_row_once(self):
+        """Test walking ranked pages both ways returns each row once."""
+        # Varied ranks with many ties between them
+        ids = {
+            create_recipe(
+                self.user, title=f'Pie number {n}',
+                description=' '.join(['apple pie'] * (n % 4))).id
+            for n in range(60)
+        }
+
+        res = self.client.get(RECIPES_URL, {'search': 'pie', 'page_size': 7})
+        pages = [[item['id'] for item in res.data['results']]]
+        # Bounded, so a cursor that never advances fails instead of hanging
+        while res.data['next'] and len(pages) < 20:
+            res = self.client.get(res.data['next'])
+            pages.append([item['id'] for item in res.data['results']])
+        found = [pk for page in pages for pk in page]
+
+        self.assertEqual(len(found), len(ids))
+        self.assertEqual(set(found), ids)
+
+        # Back from the last page through the previous links
+        back = [[item['id'] for item in res.data['results']]]
+        while res.data['previous'] and len(back) < 20:
+            res = self.client.get(res.data['previous'])
+            back.append([item['id'] for item in res.data['results']])
+
+        self.assertEqual(back[::-1], pages)
+
+    def test_search_invalid_cursor(self):
+        """Test a malformed ranked cursor is rejected."""
+        res = self.client.get(RECIPES_URL, {'search': 'pie',
+                                            'cursor': 'cD1ub3Q='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_no_match(self):
+        """Test a term matching nothing returns no recipes."""
+        create_recipe(self.user, title='Pancakes')
+
+        self.assertEqual(self._search('zzzqqq'), [])
+
+    def test_typo_falls_back_to_trigram(self):
+        """Test a misspelled term still finds similar titles."""
+        if not trigram_available():
+            self.skipTest('pg_trgm is not installed')
+        recipe = create_recipe(self.user, title='Spaghetti bolognese')
+
+        self.assertEqual(self._search('spagetti bolognase'), [recipe.id])
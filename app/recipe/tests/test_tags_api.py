@@ -2,16 +2,19 @@
     Tests for the tags API.
 """
 
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import (Tag, Recipe)
 
-from recipe.serializers import TagSerializer
+from recipe.serializers import TagListSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
 
@@ -59,13 +62,14 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         # Obtain from db
-        tags = Tag.objects.all().order_by('-name')
+        tags = Tag.objects.annotate(
+            recipe_count=Count('recipe')).order_by('-name')
         # Run data through serializer
-        serialized = TagSerializer(tags, many=True)
+        serialized = TagListSerializer(tags, many=True)
 
         # Assert response and status code as expected
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serialized.data)
+        self.assertEqual(res.data['results'], serialized.data)
 
     def test_tags_limited_to_user(self):
         """Tests list of tags limited to user."""
@@ -81,10 +85,10 @@ class PrivateTagsApiTests(TestCase):
         # Assert response and status code as expected
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         # Check length of response is 1
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
         # Check fields are the same
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         """Tests updating of tag in database."""
@@ -106,6 +110,17 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Tests renaming a tag to an existing name returns an error."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Vegan'})
+
+        tag.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(tag.name, 'Dessert')
+
     def test_delete_tag(self):
         """Tests deletion of tag in database."""
         # Create tag
@@ -121,3 +136,57 @@ class PrivateTagsApiTests(TestCase):
         # Assert tag no longer in db
         tag_exists = Tag.objects.filter(id=tag.id).exists()
         self.assertFalse(tag_exists)
+
+    def _create_recipe(self, *tags):
+        """Create a recipe linked to tags."""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Sample', time_minutes=5,
+            price=Decimal('5.00'))
+        recipe.tags.add(*tags)
+        return recipe
+
+    def test_list_includes_recipe_count(self):
+        """Test each tag reports how many recipes use it."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        Tag.objects.create(user=self.user, name='Unused')
+        self._create_recipe(vegan, dessert)
+        self._create_recipe(vegan)
+
+        res = self.client.get(TAGS_URL)
+
+        counts = {tag['name']: tag['recipe_count']
+                  for tag in res.data['results']}
+        self.assertEqual(counts, {'Vegan': 2, 'Dessert': 1, 'Unused': 0})
+
+    def test_filter_assigned_only(self):
+        """Test assigned_only lists only tags used by recipes."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Unused')
+        # Two recipes must not list the tag twice
+        self._create_recipe(vegan)
+        self._create_recipe(vegan)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([tag['id'] for tag in res.data['results']],
+                         [vegan.id])
+
+    def test_filter_assigned_only_invalid(self):
+        """Test an assigned_only value other than 0 or 1 is rejected."""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_paginated(self):
+        """Test the tag list is paged in reverse name order."""
+        for name in ('A', 'B', 'C'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names.extend(tag['name'] for tag in res.data['results'])
+
+        self.assertEqual(names, ['C', 'B', 'A'])
+        self.assertIsNone(res.data['next'])
@@ -1,41 +1,234 @@
 """
 Views for the Recipe APIs.
 """
-from rest_framework import (viewsets, mixins)
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Exists, F, Func, IntegerField, OuterRef, Subquery,
+    prefetch_related_objects)
+from django.http import StreamingHttpResponse
+
+from rest_framework import (viewsets, mixins, status)
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from drf_spectacular.utils import (
+    extend_schema_view, extend_schema, OpenApiParameter, OpenApiTypes)
 
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.db.routers import ReplicaReadMixin
 from core.models import (Recipe, Tag, Ingredient)
 from recipe import serializers
+from recipe.cache import CachedListMixin
+from recipe.conditional import (
+    ConditionalListMixin, ConditionalRetrieveMixin)
+from recipe.export import EXPORT_FORMATS
+from recipe.pagination import (RecipeCursorPagination, NameCursorPagination)
+from recipe.search import search_recipes
+
+# Largest number of recipes accepted by a single bulk create request
+MAX_BULK_CREATE = 1000
+
+# Relations rendered as nested lists and loaded with prefetch_related
+NESTED_FIELDS = ('tags', 'ingredients')
+
+
+def _params_to_ints(name, value):
+    """Convert a comma separated list of ids to integers."""
+    try:
+        return [int(str_id) for str_id in value.split(',')]
+    except ValueError:
+        raise ValidationError(
+            {name: ['Expected a comma separated list of ids.']})
+
+
+def _split_names(param, value, available):
+    """Split a comma separated list of names and check each is known."""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValidationError(
+            {param: [f'Unknown field(s): {", ".join(unknown)}.']})
+    return names
+
+
+def _has_any(field_name, ids):
+    """Return an EXISTS test for recipes linked to any of the ids."""
+    field = Recipe._meta.get_field(field_name)
+    return Exists(field.remote_field.through.objects.filter(
+        recipe_id=OuterRef('pk'),
+        **{f'{field.m2m_reverse_field_name()}__in': ids}))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def _recipe_links(field_name):
+    """Return the links from recipes to the outer tag or ingredient."""
+    field = Recipe._meta.get_field(field_name)
+    return field.remote_field.through.objects.filter(
+        **{field.m2m_reverse_field_name(): OuterRef('pk')})
+
+
+def _count(queryset):
+    """Return a subquery counting the rows of queryset."""
+    # A plain COUNT with no GROUP BY always returns one row, zero if empty
+    return Subquery(
+        queryset.order_by().annotate(
+            count=Func(F('pk'), function='COUNT')).values('count'),
+        output_field=IntegerField())
+
+
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields', OpenApiTypes.STR,
+        description='Comma separated list of fields to return'),
+    OpenApiParameter(
+        'expand', OpenApiTypes.STR,
+        description='Comma separated list of nested relations to return '
+                    'alongside fields, one of tags or ingredients'),
+]
+
+
+@extend_schema_view(
+    retrieve=extend_schema(parameters=FIELDS_PARAMETERS),
+    list=extend_schema(
+        parameters=FIELDS_PARAMETERS + [
+            OpenApiParameter(
+                'tags', OpenApiTypes.STR,
+                description='Comma separated list of tag IDs to filter'),
+            OpenApiParameter(
+                'ingredients', OpenApiTypes.STR,
+                description='Comma separated list of ingredient IDs to '
+                            'filter'),
+            OpenApiParameter(
+                'search', OpenApiTypes.STR,
+                description='Search recipe titles and descriptions, '
+                            'results are ranked by relevance'),
+        ]
+    )
+)
+class RecipeViewSet(AsyncReadMixin, ReplicaReadMixin, ConditionalListMixin,
+                    ConditionalRetrieveMixin, CachedListMixin,
+                    viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     # Set serializer to be detailed serializer as default
     serializer_class = serializers.RecipeDetailSerializer
     # Set model associated by setting queryset
     queryset = Recipe.objects.all()
     # Set support for token authentication
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     # Set so must by authenticated to access
     permission_classes = [IsAuthenticated]
+    # Page through the list with opaque cursors keyed on id
+    pagination_class = RecipeCursorPagination
 
     # Override default get query to only return logged in user
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
         # filter query set by current user
         # self.request.user contains the user data from authentication system
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user)
+
+        # Filter with EXISTS semi-joins on the through tables, so a recipe
+        # matching several ids is returned once without distinct()
+        for field_name in ('tags', 'ingredients'):
+            value = self.request.query_params.get(field_name)
+            if value:
+                ids = _params_to_ints(field_name, value)
+                queryset = queryset.filter(_has_any(field_name, ids))
+
+        queryset = queryset.order_by('-id')
+
+        term = self.request.query_params.get('search', '').strip()
+        if term:
+            queryset = search_recipes(queryset, term).order_by('-rank', '-id')
+
+        # Prefetch nested tags and ingredients so serializing a page of
+        # recipes costs a fixed number of queries rather than two per row
+        if self.action == 'upload_image':
+            # Saving only loaded columns leaves the rest of the row alone
+            return queryset.only(
+                'id', 'user', 'image', 'image_thumbnails', 'updated_at')
+        if self.action not in ('list', 'retrieve'):
+            # Writes need whole rows so save() updates every column
+            queryset = queryset.defer('search_vector')
+            if self.action in ('update', 'partial_update'):
+                # Except the image columns, so a save cannot overwrite
+                # thumbnails a worker recorded meanwhile. They load
+                # lazily when the response is rendered
+                queryset = queryset.defer('image', 'image_thumbnails')
+            return queryset.prefetch_related(
+                *serializers.nested_prefetches(*NESTED_FIELDS))
+
+        # Reads load only the columns and relations that will be rendered
+        fields = self.get_requested_fields()
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+        nested = [name for name in fields if name in NESTED_FIELDS]
+        # Cursor pagination and lookups always need the id
+        columns = serializers.recipe_columns(['id', *fields])
+        if self.use_fast_list():
+            # Plain rows for RecipeFastListSerializer, keeping the search
+            # rank that cursor pagination orders on
+            if 'rank' in queryset.query.annotations:
+                columns.append('rank')
+            return queryset.values(*columns)
+        return queryset.only(*columns).prefetch_related(
+            *serializers.nested_prefetches(*nested))
+
+    def get_requested_fields(self):
+        """Return the fields asked for with ?fields and ?expand, or None.
+
+        Without either parameter every field is rendered. Once either is
+        given, nested relations are only rendered when named.
+        """
+        if self.action not in ('list', 'retrieve'):
+            return None
+        fields = self.request.query_params.get('fields')
+        expand = self.request.query_params.get('expand')
+        if not fields and not expand:
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        if fields:
+            requested = _split_names('fields', fields, available)
+        else:
+            requested = [name for name in available
+                         if name not in NESTED_FIELDS]
+        if expand:
+            requested += _split_names('expand', expand, NESTED_FIELDS)
+
+        # Keep the serializer's field order and drop repeats
+        return [name for name in available if name in requested]
 
     # Override default
     def get_serializer_class(self):
         """Return serializer class for request."""
         if self.action == 'list':
             return serializers.RecipeSerializer
+        elif self.action == 'upload_image':
+            return serializers.RecipeImageSerializer
 
         # Else return current class
         return self.serializer_class
 
+    def use_fast_list(self):
+        """Return True if the list is rendered from values() rows."""
+        return (self.action == 'list'
+                and settings.RECIPE_FAST_LIST
+                and not getattr(self, 'swagger_fake_view', False))
+
+    def get_serializer(self, *args, **kwargs):
+        """Return a serializer limited to the requested fields."""
+        if args and self.use_fast_list():
+            kwargs.setdefault('fields', self.get_requested_fields())
+            kwargs.setdefault('context', self.get_serializer_context())
+            return serializers.RecipeFastListSerializer(*args, **kwargs)
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
     # Override default create
     # accepts second argument which is validated data from serializer
     def perform_create(self, serializer):
@@ -43,29 +236,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # Save currently serialized data with additional argument user from authentication system
         serializer.save(user=self.request.user)
 
+    # Create many recipes in one request and one transaction
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Create a list of recipes for the user."""
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': [
+                'Expected a list of recipes.']})
+        if len(request.data) > MAX_BULK_CREATE:
+            raise ValidationError({'non_field_errors': [
+                f'At most {MAX_BULK_CREATE} recipes can be created at once.']})
+
+        # Errors are reported per item in the order they were sent
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            recipes = serializer.save(user=request.user)
+
+        # Load relations for the response in bulk
+        prefetch_related_objects(
+            recipes, *serializers.nested_prefetches(*NESTED_FIELDS))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    # Store an image now and resize it in the background
+    @action(methods=['POST'], detail=True, url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """Upload an image to recipe."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe, data=request.data)
+
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # Stream every recipe rather than building one large response
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all recipes for the user as NDJSON or CSV."""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': [
+                f'Choose one of: {", ".join(EXPORT_FORMATS)}.']})
+
+        generate, content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            generate(self.get_queryset()), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{extension}"')
+        return response
+
 # Generic viewset allows you to add mixins for custom behavior.
 # mixins provide CRUD functionality automatically
 
 
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'assigned_only', OpenApiTypes.INT, enum=[0, 1],
+                description='Filter by items assigned to recipes.'),
+        ]
+    )
+)
+class BaseRecipeAttrViewSet(AsyncReadMixin,
+                            ReplicaReadMixin,
+                            ConditionalListMixin,
+                            CachedListMixin,
+                            mixins.DestroyModelMixin,
+                            mixins.UpdateModelMixin,
+                            mixins.ListModelMixin,
+                            viewsets.GenericViewSet):
     """Base view set for recipe attributes."""
     # setup view set
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameCursorPagination
+    # Recipe relation linking recipes to this model, set by subclasses
+    recipe_field = None
     # Override default get query to only return logged in user
 
     def get_queryset(self):
         """Filter tags for authenticated user."""
         # filter query set by current user
         # self.request.user contains the user data from authentication system
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        links = _recipe_links(self.recipe_field)
+
+        value = self.request.query_params.get('assigned_only', '0')
+        if value not in ('0', '1'):
+            raise ValidationError({'assigned_only': ['Expected 0 or 1.']})
+        if value == '1':
+            queryset = queryset.filter(Exists(links))
+
+        # Counted in the same query, one index lookup per row on the page
+        return queryset.annotate(
+            recipe_count=_count(links)).order_by('-name')
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
  # Setup view set
-    serializer_class = serializers.TagSerializer
+    serializer_class = serializers.TagListSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
     # Override default create
     # accepts second argument which is validated data from serializer
 
@@ -73,7 +348,8 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     # Setup view set
-    serializer_class = serializers.IngredientSerializer
+    serializer_class = serializers.IngredientListSerializer
     queryset = Ingredient.objects.all()
-    authentication_classes = [TokenAuthentication]
+    recipe_field = 'ingredients'
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
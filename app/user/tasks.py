@@ -0,0 +1,15 @@
+"""
+Background jobs for the user API.
+"""
+from django.contrib.auth import get_user_model
+
+from core.jobs import task
+
+
+@task('user.delete_account')
+def delete_account(job):
+    """Delete a deactivated user with all their recipes and tokens."""
+    # Reactivated accounts are kept
+    deleted, _ = get_user_model().objects.filter(
+        pk=job.payload['user_id'], is_active=False).delete()
+    return {'deleted': deleted}
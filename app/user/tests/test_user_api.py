@@ -1,12 +1,17 @@
 """Tests for the user API."""
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core import jobs
+from core.authentication import _cache_key, local_cache
+from core.models import Job
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -211,3 +216,56 @@ class PrivateUserApiTests(TestCase):
         # db values
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
+
+    def test_delete_user_queues_job(self):
+        """Test deleting the user deactivates them and queues deletion."""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.name, 'user.delete_account')
+        self.assertEqual(job.status, Job.QUEUED)
+
+        # The worker then removes the account
+        jobs.run(jobs.claim('test-worker')[0])
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists())
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'user-api-tests',
+    },
+}
+
+
+@override_settings(CACHES=SHARED_CACHES, TOKEN_AUTH_CACHE_ALIAS='shared')
+class DeleteUserTokenTests(TestCase):
+    """Test deleting the user revokes their token in every process."""
+
+    def test_delete_user_revokes_cached_token(self):
+        """Test a token cached by another process is refused."""
+        local_cache.clear()
+        user = create_user(email='test@example.com', password='pass123abc')
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        client.get(ME_URL)
+        cache_key = _cache_key(token.key)
+        stale = local_cache.get(cache_key)
+
+        res = client.delete(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        # Another process still holds the entry cached before the delete
+        local_cache.set(cache_key, stale, 60)
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,9 +1,20 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+
+from drf_spectacular.utils import extend_schema, extend_schema_view
+
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.db.routers import ReplicaReadMixin
+from core.jobs import enqueue
+from core.serializers import JobSerializer
 from user.serializers import (UserSerializer, AuthTokenSerializer)
 
 # Create your views here.
@@ -25,15 +36,18 @@ class CreateTokenView(ObtainAuthToken):
     # customize to use our custom serializer (switch from username to email)
     serializer_class = AuthTokenSerializer
     # Allows for browsable API from Django Rest framework UI
-    renderer_class = api_settings.DEFAULT_RENDERER_CLASSES
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+@extend_schema_view(delete=extend_schema(responses={202: JobSerializer}))
+class ManageUserView(AsyncReadMixin, ReplicaReadMixin,
+                     generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user."""
     # customize to use our custom serializer (switch from username to email)
     serializer_class = UserSerializer
     # set auth class to token auth
-    authentication_class = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     # Determines if user can do action
     permission_classes = [permissions.IsAuthenticated]
 
@@ -42,4 +56,25 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return the authenticated user."""
         # The user will be attached to request object
-        return self.request.user
+        user = self.request.user
+        # Users from the token cache only carry their id, load the rest
+        deferred = user.get_deferred_fields()
+        if deferred:
+            user.refresh_from_db(fields=deferred)
+        return user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the user now and delete their data in a job."""
+        user = self.get_object()
+        with transaction.atomic():
+            # Saving the user invalidates their cached tokens. With the
+            # shared TOKEN_AUTH_CACHE_ALIAS every process refuses them at
+            # once, otherwise other processes may still accept them for
+            # up to TOKEN_AUTH_CACHE_TTL seconds
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            job = enqueue('user.delete_account', {'user_id': user.pk},
+                          user=user)
+
+        return Response(JobSerializer(job).data,
+                        status=status.HTTP_202_ACCEPTED)